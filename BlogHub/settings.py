@@ -25,6 +25,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "blog.metrics.MetricsMiddleware",
+    "blog.querybudget.QueryBudgetMiddleware",
+    "blog.pagecache.PageCacheMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -38,7 +41,8 @@ ROOT_URLCONF = "BlogHub.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # The Django backend, timing renders for blog.metrics.
+        "BACKEND": "blog.metrics.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -46,6 +50,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "blog.context_processors.navigation",
             ],
         },
     },
@@ -96,3 +101,105 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# BlogHub
+
+# Dotted path to the search backend class. When unset, SQLite databases use
+# the FTS5 backend and every other database uses the inverted index.
+BLOG_SEARCH_BACKEND = os.environ.get("BLOG_SEARCH_BACKEND") or None
+
+# Search suggestions (see blog.autocomplete) are served from memory in each
+# process; titles are kept for the newest BLOG_AUTOCOMPLETE_MAX_POSTS posts.
+BLOG_AUTOCOMPLETE_MAX_POSTS = int(os.environ.get("BLOG_AUTOCOMPLETE_MAX_POSTS", 50000))
+
+# Post views are buffered in memory and written back every this many seconds
+# (0 disables the background flusher). Reaching the pending limit forces an
+# immediate flush.
+BLOG_VIEW_COUNTER_FLUSH_INTERVAL = float(
+    os.environ.get("BLOG_VIEW_COUNTER_FLUSH_INTERVAL", 5)
+)
+BLOG_VIEW_COUNTER_MAX_PENDING = int(
+    os.environ.get("BLOG_VIEW_COUNTER_MAX_PENDING", 10000)
+)
+
+# Trending posts (see blog.trending), recomputed by the compute_trending
+# command: views count half as much every BLOG_TRENDING_HALF_LIFE_HOURS,
+# views older than BLOG_TRENDING_WINDOW_HOURS not at all, and the top
+# BLOG_TRENDING_SIZE posts are kept site-wide and per category.
+BLOG_TRENDING_HALF_LIFE_HOURS = float(os.environ.get("BLOG_TRENDING_HALF_LIFE_HOURS", 6))
+BLOG_TRENDING_WINDOW_HOURS = int(os.environ.get("BLOG_TRENDING_WINDOW_HOURS", 72))
+BLOG_TRENDING_SIZE = int(os.environ.get("BLOG_TRENDING_SIZE", 10))
+
+# Per-request query budgets and N+1 detection (see blog.querybudget). A query
+# shape repeated this many times in one request is reported as an N+1.
+BLOG_QUERY_BUDGET_ENABLED = (
+    os.environ.get("BLOG_QUERY_BUDGET_ENABLED", str(DEBUG)) == "True"
+)
+BLOG_QUERY_BUDGET_RAISE = os.environ.get("BLOG_QUERY_BUDGET_RAISE") == "True"
+BLOG_QUERY_BUDGET_REPEAT_THRESHOLD = int(
+    os.environ.get("BLOG_QUERY_BUDGET_REPEAT_THRESHOLD", 3)
+)
+
+# Local memory by default. Set BLOG_CACHE_DIR to share the cache (page cache,
+# statistics) between worker processes through the filesystem instead.
+if os.environ.get("BLOG_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["BLOG_CACHE_DIR"],
+        }
+    }
+
+# Anonymous full-page cache for views marked with @page_cache (see
+# blog.pagecache). Pages are fresh for BLOG_PAGE_CACHE_TIMEOUT seconds, then
+# served stale for up to BLOG_PAGE_CACHE_STALE more while one request
+# regenerates them.
+BLOG_PAGE_CACHE_ENABLED = os.environ.get("BLOG_PAGE_CACHE_ENABLED", "True") == "True"
+BLOG_PAGE_CACHE_TIMEOUT = int(os.environ.get("BLOG_PAGE_CACHE_TIMEOUT", 60))
+BLOG_PAGE_CACHE_STALE = int(os.environ.get("BLOG_PAGE_CACHE_STALE", 300))
+BLOG_PAGE_CACHE_LOCK_TIMEOUT = int(os.environ.get("BLOG_PAGE_CACHE_LOCK_TIMEOUT", 30))
+
+# Per-view request metrics, served in Prometheus format at /metrics/ to staff
+# (see blog.metrics). Requests slower than BLOG_SLOW_REQUEST_THRESHOLD seconds
+# are logged with their SQL.
+BLOG_METRICS_ENABLED = os.environ.get("BLOG_METRICS_ENABLED", "True") == "True"
+BLOG_SLOW_REQUEST_THRESHOLD = float(os.environ.get("BLOG_SLOW_REQUEST_THRESHOLD", 0.5))
+
+# SQLite tuning for concurrent use. The "production" profile puts the
+# database in WAL mode so readers don't block on writers, keeps connections
+# open for BLOG_DB_CONN_MAX_AGE seconds, waits up to BLOG_DB_TIMEOUT seconds
+# for locks instead of failing, and sends reads to a read-only "replica"
+# connection to the same file (see blog.routers).
+BLOG_DB_PROFILE = os.environ.get("BLOG_DB_PROFILE", "default")
+if BLOG_DB_PROFILE == "production":
+    SQLITE_PRAGMAS = [
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={int(os.environ.get('BLOG_DB_MMAP_MB', 256)) * 1024 * 1024}",
+        # Negative sizes are in KiB.
+        f"PRAGMA cache_size=-{int(os.environ.get('BLOG_DB_CACHE_MB', 64)) * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    DATABASES["default"].update(
+        {
+            "CONN_MAX_AGE": int(os.environ.get("BLOG_DB_CONN_MAX_AGE", 600)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": ";".join(["PRAGMA journal_mode=WAL", *SQLITE_PRAGMAS]),
+                "timeout": float(os.environ.get("BLOG_DB_TIMEOUT", 20)),
+                # Take the write lock up front, so a transaction that reads
+                # before writing can't fail to upgrade its lock.
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    )
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": f"file:{DATABASES['default']['NAME']}?mode=ro",
+        "OPTIONS": {
+            "init_command": ";".join(["PRAGMA query_only=ON", *SQLITE_PRAGMAS]),
+            "timeout": DATABASES["default"]["OPTIONS"]["timeout"],
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["blog.routers.ReadReplicaRouter"]
@@ -0,0 +1,5 @@
+"""
+Reproducible benchmarks for BlogHub's request paths.
+
+Run with ``python -m benchmarks --help``.
+"""
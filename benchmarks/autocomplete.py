@@ -0,0 +1,113 @@
+"""
+Load time, memory and lookup latency of the search suggestion index
+(``blog.autocomplete``), both for the index alone and through the JSON
+endpoint.
+
+    python -m benchmarks.autocomplete --posts 50000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.autocomplete", description=__doc__
+    )
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--lookups", type=int, default=2000)
+    return parser.parse_args(argv)
+
+
+def prefixes(index, count, seed):
+    """Prefixes of 1 to 6 characters of randomly chosen keys."""
+    rng = random.Random(seed)
+    keys = index.arrays[0]
+    return [rng.choice(keys)[: rng.randint(1, 6)] for _ in range(count)]
+
+
+def percentiles(timings):
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "p50_us": round(quantiles[49] * 1e6, 1),
+        "p99_us": round(quantiles[98] * 1e6, 1),
+    }
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BlogHub.settings")
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+
+    from blog import autocomplete
+    from blog.counters import view_counter
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command(
+            "generate_data",
+            posts=args.posts,
+            authors=args.authors,
+            seed=args.seed,
+            verbosity=0,
+            stdout=open(os.devnull, "w"),
+        )
+        started = time.perf_counter()
+        autocomplete.index.load()
+        load_time = time.perf_counter() - started
+        # Tracing slows loading down, so memory is measured on a second load.
+        autocomplete.index.arrays = ([], [])
+        autocomplete.index.entries, autocomplete.index.by_object = [], {}
+        tracemalloc.start()
+        autocomplete.index.load()
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = autocomplete.index.stats()
+        print(
+            f"index    {stats['entries']:,} entries, {stats['keys']:,} keys, "
+            f"loaded in {load_time:.2f}s, {stats['bytes'] / 2**20:.1f} MiB "
+            f"(traced {traced / 2**20:.1f} MiB)"
+        )
+
+        queries = prefixes(autocomplete.index, args.lookups, args.seed)
+        timings = []
+        for prefix in queries:
+            start = time.perf_counter()
+            autocomplete.index.suggest(prefix)
+            timings.append(time.perf_counter() - start)
+        result = percentiles(timings)
+        print(f"suggest  p50 {result['p50_us']:>8.1f}us  p99 {result['p99_us']:>8.1f}us")
+
+        client = Client()
+        url = reverse("blog:search_autocomplete")
+        timings = []
+        with override_settings(BLOG_METRICS_ENABLED=False, BLOG_QUERY_BUDGET_ENABLED=False):
+            for prefix in queries:
+                start = time.perf_counter()
+                client.get(url, {"q": prefix})
+                timings.append(time.perf_counter() - start)
+        result = percentiles(timings)
+        print(f"endpoint p50 {result['p50_us']:>8.1f}us  p99 {result['p99_us']:>8.1f}us")
+    finally:
+        view_counter.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
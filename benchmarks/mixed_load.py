@@ -0,0 +1,258 @@
+"""
+Throughput of concurrent reads and writes against an on-disk SQLite database
+under each database profile (``BLOG_DB_PROFILE``).
+
+Reader threads send GET requests through the WSGI handler, so connections
+are opened and closed per request exactly as in production. Writer threads
+update and create posts through the ORM, as the CRUD views do, while the
+view counter flushes in the background. Each profile runs in its own
+process, since the profile is read when settings are loaded.
+
+    python -m benchmarks.mixed_load --seconds 10 --readers 8 --writers 2
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+PROFILES = ["default", "production"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.mixed_load", description=__doc__
+    )
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--profiles", nargs="+", choices=PROFILES, default=PROFILES, metavar="PROFILE"
+    )
+    parser.add_argument("--output", help="Write the JSON results here.")
+    # Internal: run one profile in this process and print its results.
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+class Totals:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.read_latencies = []
+
+    def add(self, reads=0, writes=0, errors=0, latencies=()):
+        with self.lock:
+            self.reads += reads
+            self.writes += writes
+            self.errors += errors
+            self.read_latencies.extend(latencies)
+
+
+def get(handler, path):
+    """Send a GET request through ``handler``; returns the status code."""
+    path, _, query = path.partition("?")
+    environ = {
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "REQUEST_METHOD": "GET",
+        "wsgi.input": io.BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in response:
+            pass
+    finally:
+        # Fires request_finished, which closes or keeps the connections.
+        response.close()
+    return int(status[0].split()[0])
+
+
+def reader(handler, paths, deadline, totals, seed):
+    from django.db import connections
+
+    rng = random.Random(seed)
+    reads = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status = get(handler, rng.choice(paths))
+        latencies.append(time.perf_counter() - start)
+        reads += 1
+        errors += status >= 500
+    connections.close_all()
+    totals.add(reads=reads, errors=errors, latencies=latencies)
+
+
+def writer(post_ids, deadline, totals, seed):
+    from django.db import DatabaseError, close_old_connections, connections
+
+    from blog.models import Post
+
+    rng = random.Random(seed)
+    writes = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            if writes % 4 == 0:
+                template = Post.objects.get(pk=rng.choice(post_ids))
+                Post.objects.create(
+                    title=f"Mixed load post {seed}-{writes}",
+                    author_id=template.author_id,
+                    category_id=template.category_id,
+                    excerpt=template.excerpt,
+                    content=template.content,
+                    published=True,
+                )
+            else:
+                post = Post.objects.get(pk=rng.choice(post_ids))
+                post.excerpt = f"Edited {writes}"
+                post.save()
+            writes += 1
+        except DatabaseError:
+            errors += 1
+        close_old_connections()
+    connections.close_all()
+    totals.add(writes=writes, errors=errors)
+
+
+def run_profile(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BlogHub.settings")
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.management import call_command
+    from django.db import connection, connections
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+
+    from blog.counters import view_counter
+    from blog.models import Category, Post
+
+    # Failed requests are counted, not logged one by one.
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    setup_test_environment()
+
+    directory = tempfile.mkdtemp(prefix="bloghub-mixed-")
+    path = os.path.join(directory, "db.sqlite3")
+    settings.DATABASES["default"].setdefault("TEST", {})["NAME"] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    if "replica" in connections:
+        connections["replica"].settings_dict["NAME"] = f"file:{path}?mode=ro"
+    try:
+        call_command(
+            "generate_data",
+            posts=args.posts,
+            authors=args.authors,
+            seed=args.seed,
+            # Post pages show related posts.
+            related=True,
+            verbosity=0,
+            stdout=open(os.devnull, "w"),
+        )
+        post_ids = list(Post.objects.filter(published=True).values_list("pk", flat=True))
+        rng = random.Random(args.seed)
+        paths = [reverse("blog:home"), reverse("blog:posts")]
+        paths += [reverse("blog:post_detail", args=[pk]) for pk in rng.sample(post_ids, 50)]
+        paths += [
+            reverse("blog:category_posts", args=[slug])
+            for slug in Category.objects.values_list("slug", flat=True)
+        ]
+        connections.close_all()
+
+        totals = Totals()
+        with override_settings(
+            BLOG_QUERY_BUDGET_ENABLED=False,
+            BLOG_PAGE_CACHE_ENABLED=False,
+            BLOG_METRICS_ENABLED=False,
+            BLOG_VIEW_COUNTER_FLUSH_INTERVAL=0.5,
+        ):
+            handler = WSGIHandler()
+            deadline = time.perf_counter() + args.seconds
+            threads = [
+                threading.Thread(target=reader, args=(handler, paths, deadline, totals, i))
+                for i in range(args.readers)
+            ] + [
+                threading.Thread(target=writer, args=(post_ids, deadline, totals, i))
+                for i in range(args.writers)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            view_counter.stop()
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    quantiles = statistics.quantiles(totals.read_latencies, n=100, method="inclusive")
+    return {
+        "reads_per_sec": round(totals.reads / elapsed, 1),
+        "writes_per_sec": round(totals.writes / elapsed, 1),
+        "errors": totals.errors,
+        "read_p50_ms": round(quantiles[49] * 1000, 3),
+        "read_p95_ms": round(quantiles[94] * 1000, 3),
+    }
+
+
+def format_row(profile, result):
+    return (
+        f"{profile:<12} {result['reads_per_sec']:>9.1f} reads/s  "
+        f"{result['writes_per_sec']:>8.1f} writes/s  "
+        f"read p50 {result['read_p50_ms']:>7.2f}ms  p95 {result['read_p95_ms']:>7.2f}ms  "
+        f"{result['errors']:>4} errors"
+    )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.worker:
+        print(json.dumps(run_profile(args)))
+        return 0
+
+    results = {}
+    for profile in args.profiles:
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.mixed_load", "--worker", *argv],
+            env={**os.environ, "BLOG_DB_PROFILE": profile},
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode:
+            sys.stderr.write(child.stderr)
+            return child.returncode
+        results[profile] = json.loads(child.stdout.splitlines()[-1])
+        print(format_row(profile, results[profile]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
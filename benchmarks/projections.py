@@ -0,0 +1,103 @@
+"""
+Memory and time to load one page of each listing with full rows and with the
+card projection (``PostQuerySet.cards()``).
+
+    python -m benchmarks.projections --posts 5000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.projections", description=__doc__
+    )
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed loads per listing.")
+    return parser.parse_args(argv)
+
+
+def listings():
+    """``{name: queryset}`` of the rows the listing views load for one page."""
+    from blog.models import Post
+    from blog.pagination import KeysetPaginator
+    from blog.views import POSTS_PER_PAGE
+
+    post = Post.objects.filter(published=True).first()
+    published = Post.objects.filter(published=True)
+    pages = {
+        "posts": published,
+        "category_posts": published.filter(category_id=post.category_id),
+        "author_posts": published.filter(author_id=post.author_id),
+    }
+    queries = {
+        name: KeysetPaginator(queryset, POSTS_PER_PAGE).query(None)[0]
+        for name, queryset in pages.items()
+    }
+    queries["home featured"] = Post.objects.filter(is_featured=True)
+    return queries
+
+
+def measure(queryset, repeat):
+    tracemalloc.start()
+    rows = list(queryset)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - start)
+    return {
+        "rows": len(rows),
+        "peak_kib": round(peak / 1024, 1),
+        "ms": round(statistics.median(timings) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BlogHub.settings")
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+
+    from blog.counters import view_counter
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command(
+            "generate_data",
+            posts=args.posts,
+            authors=args.authors,
+            seed=args.seed,
+            verbosity=0,
+            stdout=open(os.devnull, "w"),
+        )
+        for name, queryset in listings().items():
+            full = measure(queryset.select_related("author", "category"), args.repeat)
+            cards = measure(queryset.cards(), args.repeat)
+            print(
+                f"{name:<16} {full['rows']:>4} rows  "
+                f"full {full['peak_kib']:>8.1f} KiB {full['ms']:>7.2f}ms  "
+                f"cards {cards['peak_kib']:>8.1f} KiB {cards['ms']:>7.2f}ms  "
+                f"({cards['peak_kib'] / full['peak_kib']:.0%} of the memory)"
+            )
+    finally:
+        view_counter.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Seed a throwaway database, drive every scenario through the Django test
+client (or the ASGI handler) and report latency percentiles, query counts
+and peak memory per path.
+
+    python -m benchmarks --posts 5000 --requests 100 --output results.json
+    python -m benchmarks --posts 5000 --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=50, help="Measured requests per path.")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per path.")
+    parser.add_argument(
+        "--client",
+        choices=["wsgi", "asgi"],
+        default="wsgi",
+        help="Drive requests through the WSGI test client or the ASGI handler.",
+    )
+    parser.add_argument(
+        "--page-cache",
+        action="store_true",
+        help="Leave the anonymous page cache on (it is off to measure the views).",
+    )
+    parser.add_argument(
+        "--only", nargs="+", metavar="PATH", help="Run only these scenarios."
+    )
+    parser.add_argument(
+        "--db-file",
+        help="Benchmark against this SQLite file instead of an in-memory database.",
+    )
+    parser.add_argument("--output", help="Write the JSON results here.")
+    parser.add_argument("--baseline", help="Compare against these JSON results.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Flag a path whose p95 latency grows by more than this factor.",
+    )
+    return parser.parse_args(argv)
+
+
+def setup_django(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BlogHub.settings")
+    import django
+
+    django.setup()
+    from django.conf import settings
+
+    if args.db_file:
+        settings.DATABASES["default"].setdefault("TEST", {})["NAME"] = args.db_file
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+def summarize(latencies, queries, peak_bytes):
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "queries": queries,
+        "peak_memory_kib": round(peak_bytes / 1024, 1),
+    }
+
+
+class Driver:
+    def __init__(self, kind):
+        from django.test import AsyncClient, Client
+
+        self.kind = kind
+        self.client = AsyncClient() if kind == "asgi" else Client()
+        self.loop = asyncio.new_event_loop() if kind == "asgi" else None
+
+    def request(self, method, path, data=None):
+        kwargs = {} if data is None else {"data": data}
+        response = getattr(self.client, method)(path, **kwargs)
+        if self.loop is not None:
+            response = self.loop.run_until_complete(response)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method.upper()} {path} returned {response.status_code}")
+        return response
+
+    @contextmanager
+    def capture_queries(self):
+        """Record queries on the connections the views will actually use."""
+        from blog.querybudget import QueryRecorder, install, recording, uninstall
+
+        if self.loop is None:
+            with recording(QueryRecorder()) as recorder:
+                yield recorder
+            return
+
+        # Sync views under ASGI run on asgiref's shared thread, which has its
+        # own connections.
+        from asgiref.sync import sync_to_async
+
+        recorder = QueryRecorder()
+        self.loop.run_until_complete(sync_to_async(install)(recorder))
+        try:
+            yield recorder
+        finally:
+            self.loop.run_until_complete(sync_to_async(uninstall)(recorder))
+
+
+def run_scenario(driver, scenario, fixtures, args):
+    iteration = 0
+
+    def send():
+        nonlocal iteration
+        data = scenario.data(fixtures, iteration) if scenario.data else None
+        driver.request(scenario.method, scenario.path(fixtures, iteration), data)
+        iteration += 1
+
+    for _ in range(args.warmup):
+        send()
+
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+
+    # Query counting and tracemalloc both slow requests down, so they get a
+    # separate, unmeasured request.
+    tracemalloc.start()
+    with driver.capture_queries() as queries:
+        send()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return summarize(latencies, len(queries), peak)
+
+
+def run(args):
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    from blog.counters import view_counter
+
+    from .scenarios import SCENARIOS, Fixtures
+
+    scenarios = [s for s in SCENARIOS if not args.only or s.name in args.only]
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed_started = time.perf_counter()
+        call_command(
+            "generate_data",
+            posts=args.posts,
+            authors=args.authors,
+            seed=args.seed,
+            # Post pages show related posts.
+            related=True,
+            verbosity=0,
+            stdout=open(os.devnull, "w"),
+        )
+        print(f"Seeded {args.posts:,} posts in {time.perf_counter() - seed_started:.1f}s")
+        fixtures = Fixtures(args.seed, args.warmup + args.requests + 1)
+
+        results = {}
+        with override_settings(
+            BLOG_QUERY_BUDGET_ENABLED=False, BLOG_PAGE_CACHE_ENABLED=args.page_cache
+        ):
+            driver = Driver(args.client)
+            for scenario in scenarios:
+                results[scenario.name] = run_scenario(driver, scenario, fixtures, args)
+                print(format_row(scenario.name, results[scenario.name]))
+    finally:
+        view_counter.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "posts": args.posts,
+            "authors": args.authors,
+            "seed": args.seed,
+            "requests": args.requests,
+            "client": args.client,
+            "page_cache": args.page_cache,
+            "db_file": args.db_file,
+        },
+        "results": results,
+    }
+
+
+def format_row(name, result):
+    return (
+        f"{name:<18} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+        f"p99 {result['p99_ms']:>9.2f}ms  {result['queries']:>3} queries  "
+        f"{result['peak_memory_kib']:>9.1f} KiB"
+    )
+
+
+def compare(current, baseline, threshold):
+    """Return a list of regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            continue
+        if after["p95_ms"] > before["p95_ms"] * threshold:
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.2f}ms -> {after['p95_ms']:.2f}ms"
+            )
+        if after["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: queries {before['queries']} -> {after['queries']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    setup_django(args)
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
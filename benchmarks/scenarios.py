@@ -0,0 +1,108 @@
+"""Request paths exercised by the benchmark runner."""
+
+import random
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.urls import reverse
+
+from blog.models import AuthorProfile, Category, Post
+
+SEARCH_TERMS = ["django", "python design", "data", "habit focus", "web", "career"]
+
+
+class Fixtures:
+    """Ids and slugs sampled from the seeded database for building URLs."""
+
+    def __init__(self, seed, requests):
+        rng = random.Random(seed)
+        # Sampled with the seeded generator, from a stable order, so the same
+        # seed requests the same posts in every run.
+        post_ids = list(
+            Post.objects.filter(published=True).order_by("pk").values_list("pk", flat=True)
+        )
+        self.post_ids = rng.sample(post_ids, min(500, len(post_ids)))
+        # Posts reserved for the delete scenario, so every request deletes one.
+        self.deletable_ids, self.post_ids = (
+            self.post_ids[:requests],
+            self.post_ids[requests:] or self.post_ids,
+        )
+        self.category_slugs = list(Category.objects.order_by("pk").values_list("slug", flat=True))
+        self.category_ids = list(Category.objects.order_by("pk").values_list("pk", flat=True))
+        self.author_slugs = list(
+            AuthorProfile.objects.filter(user__posts__published=True)
+            .distinct()
+            .order_by("pk")
+            .values_list("slug", flat=True)[:200]
+        )
+        self.author_id = Post.objects.values_list("author_id", flat=True).first()
+
+    def pick(self, items, i):
+        return items[i % len(items)]
+
+    def post_form(self, i, prefix):
+        return {
+            "title": f"{prefix} benchmark post {i}",
+            "excerpt": "Benchmark excerpt",
+            "content": "Benchmark content " * 50,
+            "category": self.pick(self.category_ids, i),
+            "author": self.author_id,
+            "published": "on",
+        }
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[Fixtures, int], str]
+    data: Optional[Callable[[Fixtures, int], dict]] = None
+
+
+SCENARIOS = [
+    Scenario("home", "get", lambda f, i: reverse("blog:home")),
+    Scenario("posts", "get", lambda f, i: reverse("blog:posts")),
+    Scenario(
+        "post_detail",
+        "get",
+        lambda f, i: reverse("blog:post_detail", args=[f.pick(f.post_ids, i)]),
+    ),
+    Scenario(
+        "category_posts",
+        "get",
+        lambda f, i: reverse("blog:category_posts", args=[f.pick(f.category_slugs, i)]),
+    ),
+    Scenario(
+        "author_posts",
+        "get",
+        lambda f, i: reverse("blog:author_posts", args=[f.pick(f.author_slugs, i)]),
+    ),
+    Scenario(
+        "search_posts",
+        "get",
+        lambda f, i: reverse("blog:search_posts") + f"?q={f.pick(SEARCH_TERMS, i)}",
+    ),
+    Scenario("post_create_form", "get", lambda f, i: reverse("blog:post_create")),
+    Scenario(
+        "post_create",
+        "post",
+        lambda f, i: reverse("blog:post_create"),
+        lambda f, i: f.post_form(i, "Created"),
+    ),
+    Scenario(
+        "post_update_form",
+        "get",
+        lambda f, i: reverse("blog:post_update", args=[f.pick(f.post_ids, i)]),
+    ),
+    Scenario(
+        "post_update",
+        "post",
+        lambda f, i: reverse("blog:post_update", args=[f.pick(f.post_ids, i)]),
+        lambda f, i: f.post_form(i, "Updated"),
+    ),
+    Scenario(
+        "post_delete",
+        "post",
+        lambda f, i: reverse("blog:post_delete", args=[f.pick(f.deletable_ids, i)]),
+    ),
+]
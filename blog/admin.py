@@ -1,32 +1,65 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Tag, Post
+from .models import AuthorProfile, Category, Tag, Post
+
+
+class PostCountFilter(admin.SimpleListFilter):
+    title = "usage"
+    parameter_name = "usage"
+
+    def lookups(self, request, model_admin):
+        return (
+            ("unused", "No posts"),
+            ("used", "1 - 9 posts"),
+            ("popular", "10+ posts"),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == "unused":
+            return queryset.filter(post_count=0)
+        if self.value() == "used":
+            return queryset.filter(post_count__gte=1, post_count__lt=10)
+        if self.value() == "popular":
+            return queryset.filter(post_count__gte=10)
+        return queryset
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "post_count")
+    list_display = ("name", "slug", "icon", "number_of_posts")
+    list_filter = (PostCountFilter,)
+    prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name",)
     ordering = ("name",)
     list_per_page = 20
 
-    def post_count(self, obj):
-        return obj.posts.count()
+    def number_of_posts(self, obj):
+        return obj.post_count
 
-    post_count.short_description = "Number of Posts"
+    number_of_posts.short_description = "Number of Posts"
+    number_of_posts.admin_order_field = "post_count"
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ("name", "post_count")
+    list_display = ("name", "used_in_posts")
+    list_filter = (PostCountFilter,)
     search_fields = ("name",)
     ordering = ("name",)
     list_per_page = 20
 
-    def post_count(self, obj):
-        return obj.posts.count()
+    def used_in_posts(self, obj):
+        return obj.post_count
 
-    post_count.short_description = "Used In Posts"
+    used_in_posts.short_description = "Used In Posts"
+    used_in_posts.admin_order_field = "post_count"
+
+
+@admin.register(AuthorProfile)
+class AuthorProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "slug")
+    search_fields = ("slug", "user__username", "user__first_name", "user__last_name")
+    list_select_related = ("user",)
 
 
 @admin.register(Post)
@@ -60,8 +93,12 @@ class PostAdmin(admin.ModelAdmin):
         "tags__name",
     )
     list_per_page = 15
+    list_select_related = ("author", "category")
+
+    readonly_fields = ("views", "word_count", "reading_time", "created_at")
 
-    readonly_fields = ("views", "created_at")
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("tags")
 
     def tag_list(self, obj):
         tags = obj.tags.all()
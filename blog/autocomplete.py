@@ -0,0 +1,283 @@
+"""
+Search suggestions from post titles, tag, category and author names.
+
+Each process keeps a sorted array of lowercased keys, one per word a name can
+be completed from ("django tips", "tips"), and answers a prefix with two
+binary searches over it. The array is loaded on first use and reloaded when
+the shared version in the cache moves on; the process that saves a change
+applies it in place instead (see ``changed()``), so editing a post doesn't
+rebuild the index there.
+
+Titles are indexed for the newest ``BLOG_AUTOCOMPLETE_MAX_POSTS`` published
+posts only, which bounds the index's memory; ``stats()`` reports it.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Category, Post, Tag
+from .search import MAX_CHAR, STOP_WORDS, TOKEN_RE
+
+VERSION_KEY = "blog:autocomplete-version"
+MAX_KEY_LENGTH = 64
+SUGGESTIONS = 8
+
+POST = "post"
+CATEGORY = "category"
+TAG = "tag"
+AUTHOR = "author"
+
+
+def normalize(text):
+    return " ".join(TOKEN_RE.findall(text.lower()))
+
+
+def keys_for(label):
+    """The keys ``label`` is suggested for: its text from each word on."""
+    words = normalize(label).split(" ")
+    return {
+        " ".join(words[i:])[:MAX_KEY_LENGTH]
+        for i, word in enumerate(words)
+        if word and (i == 0 or word not in STOP_WORDS)
+    }
+
+
+def max_posts():
+    return getattr(settings, "BLOG_AUTOCOMPLETE_MAX_POSTS", 50_000)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every process reload, e.g. after bulk writes that skip signals."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Evicted: everyone reloads anyway.
+        pass
+
+
+def author_label(user):
+    return user.get_full_name() or user.username
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        # (sorted keys, entry index of each key), replaced as a whole so
+        # readers never see one updated without the other.
+        self.arrays = ([], [])
+        self.entries = []  # (kind, label, url argument), None once removed
+        self.by_object = {}  # (kind, pk) -> entry index
+
+    def rows(self):
+        """``(kind, pk, label, url argument)`` of everything suggested."""
+        for pk, name, slug in Category.objects.values_list("pk", "name", "slug"):
+            yield CATEGORY, pk, name, slug
+        for pk, name in Tag.objects.values_list("pk", "name"):
+            yield TAG, pk, name, name
+        authors = (
+            User.objects.filter(posts__published=True)
+            .distinct()
+            .values_list("pk", "username", "first_name", "last_name", "profile__slug")
+        )
+        for pk, username, first_name, last_name, slug in authors:
+            yield AUTHOR, pk, f"{first_name} {last_name}".strip() or username, slug
+            if first_name or last_name:
+                yield AUTHOR, f"{pk}:username", username, slug
+        posts = Post.objects.filter(published=True).order_by("-created_at", "-id")
+        for pk, title in posts.values_list("pk", "title")[: max_posts()].iterator(5000):
+            yield POST, pk, title, pk
+
+    def load(self):
+        version = current_version()
+        entries, by_object, pairs = [], {}, []
+        for kind, pk, label, argument in self.rows():
+            by_object[kind, pk] = len(entries)
+            pairs.extend((key, len(entries)) for key in keys_for(label))
+            entries.append((kind, label, argument))
+        pairs.sort()
+        self.entries, self.by_object = entries, by_object
+        self.arrays = ([key for key, _ in pairs], [ref for _, ref in pairs])
+        self.version = version
+
+    def ensure_current(self):
+        version = current_version()
+        if self.version != version:
+            with self._lock:
+                if self.version != version:
+                    self.load()
+
+    def suggest(self, prefix, limit=SUGGESTIONS):
+        """Up to ``limit`` ``(kind, label, url argument)`` completing ``prefix``."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self.ensure_current()
+        (keys, refs), entries = self.arrays, self.entries
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, start)
+        found = {}
+        for i in range(start, end):
+            entry = entries[refs[i]]
+            if entry is not None:
+                found.setdefault(refs[i], entry)
+                if len(found) >= limit * 4:
+                    break
+        # Names that start with the prefix first, then the shortest.
+        ranked = sorted(
+            found.values(),
+            key=lambda entry: (not normalize(entry[1]).startswith(prefix), len(entry[1])),
+        )
+        return ranked[:limit]
+
+    def update(self, keys, refs, kind, pk, label=None, argument=None):
+        """
+        Replace the suggestion for one object, adding or removing its keys in
+        ``keys`` and ``refs``; no ``label`` removes it.
+        """
+        ref = self.by_object.pop((kind, pk), None)
+        if ref is not None:
+            for key in keys_for(self.entries[ref][1]):
+                i = bisect_left(keys, key)
+                while i < len(keys) and keys[i] == key and refs[i] != ref:
+                    i += 1
+                if i < len(keys) and keys[i] == key:
+                    del keys[i], refs[i]
+            self.entries[ref] = None
+        if label:
+            ref = len(self.entries)
+            self.entries.append((kind, label, argument))
+            self.by_object[kind, pk] = ref
+            for key in keys_for(label):
+                i = bisect_left(keys, key)
+                keys.insert(i, key)
+                refs.insert(i, ref)
+
+    def changed(self, *updates):
+        """
+        Apply ``(kind, pk, label, url argument)`` updates once the transaction
+        commits, here and, through the shared version, everywhere else.
+        """
+        transaction.on_commit(lambda: self._apply(updates))
+
+    def _apply(self, updates):
+        with self._lock:
+            up_to_date = self.version is not None and self.version == cache.get(VERSION_KEY)
+            if up_to_date:
+                keys, refs = (list(array) for array in self.arrays)
+                for update in updates:
+                    self.update(keys, refs, *update)
+                self.arrays = (keys, refs)
+            try:
+                version = cache.incr(VERSION_KEY)
+            except ValueError:
+                # Evicted: everyone reloads.
+                self.version = None
+                return
+            # Keep this copy only if no other process changed anything since
+            # it was last current.
+            if up_to_date and version == self.version + 1:
+                self.version = version
+            else:
+                self.version = None
+
+    def stats(self):
+        """Entry and key counts, and the approximate memory held, in bytes."""
+        (keys, refs), entries = self.arrays, self.entries
+        size = sys.getsizeof(keys) + sys.getsizeof(refs) + sys.getsizeof(entries)
+        size += sum(map(sys.getsizeof, keys)) + sum(map(sys.getsizeof, refs))
+        for entry in entries:
+            if entry is not None:
+                size += sys.getsizeof(entry) + sys.getsizeof(entry[1])
+        return {"entries": len(self.by_object), "keys": len(keys), "bytes": size}
+
+
+index = AutocompleteIndex()
+
+
+def suggest(prefix, limit=SUGGESTIONS):
+    """``[{"label", "kind", "url"}]`` completing ``prefix``."""
+    suggestions = []
+    for kind, label, argument in index.suggest(prefix, limit):
+        if kind == POST:
+            url = reverse("blog:post_detail", args=[argument])
+        elif kind == CATEGORY:
+            url = reverse("blog:category_posts", args=[argument])
+        elif kind == AUTHOR:
+            url = reverse("blog:author_posts", args=[argument])
+        else:
+            url = reverse("blog:search_posts") + "?" + urlencode({"q": argument})
+        suggestions.append({"label": label, "kind": kind, "url": url})
+    return suggestions
+
+
+def render_metrics():
+    """The index's size, in the Prometheus text exposition format."""
+    lines = []
+    for name, value in index.stats().items():
+        metric = f"bloghub_autocomplete_{name}"
+        lines += [
+            f"# HELP {metric} Suggestion index {name} in this process.",
+            f"# TYPE {metric} gauge",
+            f"{metric} {value}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def author_updates(user, slug):
+    """An author is suggested by full name and, if they have one, username."""
+    username = user.username if user.first_name or user.last_name else None
+    return [
+        (AUTHOR, user.pk, author_label(user), slug),
+        (AUTHOR, f"{user.pk}:username", username, slug),
+    ]
+
+
+def post_changed(post, created):
+    # ``saved_state`` still holds the values from before this save.
+    before = {} if created else post.saved_state
+    if not created and all(
+        before.get(field, getattr(post, field)) == getattr(post, field)
+        for field in ("title", "published")
+    ):
+        return
+    updates = [(POST, post.pk, post.title if post.published else None, post.pk)]
+    # Only a loaded index can tell whether the author is new to it.
+    if post.published and index.version is not None:
+        if (AUTHOR, post.author_id) not in index.by_object:
+            updates += author_updates(post.author, post.author.profile.slug)
+    index.changed(*updates)
+
+
+def post_deleted(post):
+    index.changed((POST, post.pk, None, None))
+
+
+def category_changed(category, deleted=False):
+    index.changed((CATEGORY, category.pk, None if deleted else category.name, category.slug))
+
+
+def tag_changed(tag, deleted=False):
+    index.changed((TAG, tag.pk, None if deleted else tag.name, tag.name))
+
+
+def author_changed(user):
+    ref = index.by_object.get((AUTHOR, user.pk))
+    index.changed(*([] if ref is None else author_updates(user, index.entries[ref][2])))
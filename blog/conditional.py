@@ -0,0 +1,74 @@
+"""
+Conditional GET for post pages and listings.
+
+A post page is validated by the post's ``updated_at``. Listings are validated
+by the newest ``updated_at`` of any post, which SQLite answers from the end of
+its index, together with the listing's cached post count, which changes when
+a post is deleted or unpublished.
+"""
+
+from datetime import timezone as dt_timezone
+
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Post
+
+
+def touch_posts(posts):
+    """Mark ``posts`` as changed, e.g. when their category is renamed."""
+    posts.update(updated_at=timezone.now())
+
+
+def latest_update():
+    return Post.objects.aggregate(latest=Max("updated_at"))["latest"]
+
+
+async def alatest_update():
+    return (await Post.objects.aaggregate(latest=Max("updated_at")))["latest"]
+
+
+def aware(value):
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def validators_for(prefix, updated_at):
+    """
+    ``(etag, last_modified)``. Last-Modified only has second resolution, so
+    the ETag carries microseconds to tell apart changes within one second.
+    """
+    updated_at = aware(updated_at)
+    if updated_at is None:
+        return f'W/"{prefix}"', None
+    version = int(updated_at.timestamp() * 1_000_000)
+    return f'W/"{prefix}-{version}"', int(updated_at.timestamp())
+
+
+def post_validators(post):
+    return validators_for(f"post-{post.pk}", post.updated_at)
+
+
+def listing_validators(latest, count):
+    return validators_for(f"posts-{count}", latest)
+
+
+def add_validators(request, response, validators):
+    etag, last_modified = validators
+    if request.method in ("GET", "HEAD"):
+        response.headers.setdefault("ETag", etag)
+        if last_modified is not None:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+    return response
+
+
+def not_modified(request, validators):
+    """A 304 (or 412) response if the client's copy is current, else ``None``."""
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        add_validators(request, response, validators)
+    return response
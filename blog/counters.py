@@ -0,0 +1,126 @@
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+
+from . import stats, trending
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+UPDATE_BATCH_SIZE = 500
+
+
+class ViewCounter:
+    """
+    Write-behind accumulator for ``Post.views``.
+
+    Hits are counted in memory and a daemon thread applies them every
+    ``BLOG_VIEW_COUNTER_FLUSH_INTERVAL`` seconds as a handful of
+    ``UPDATE ... SET views = views + n`` statements, one per distinct
+    increment. At most ``BLOG_VIEW_COUNTER_MAX_PENDING`` posts are buffered;
+    reaching that flushes on the recording thread instead. Pending hits are
+    also flushed at interpreter shutdown. Each flush also adds its views to
+    the hourly buckets trending posts are ranked from (see blog.trending).
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopping = threading.Event()
+
+    @property
+    def interval(self):
+        return getattr(settings, "BLOG_VIEW_COUNTER_FLUSH_INTERVAL", 5.0)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, "BLOG_VIEW_COUNTER_MAX_PENDING", 10_000)
+
+    def _add(self, post_id, hits):
+        """Buffer the hits; returns whether the buffer is full and must be flushed."""
+        with self._lock:
+            self._pending[post_id] += hits
+            full = len(self._pending) >= self.max_pending
+        if not full:
+            self.start()
+        return full
+
+    def record(self, post_id, hits=1):
+        if self._add(post_id, hits):
+            self.flush()
+
+    async def arecord(self, post_id, hits=1):
+        if self._add(post_id, hits):
+            await sync_to_async(self.flush)()
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def live_count(self, post):
+        """Stored plus not yet flushed views of ``post``."""
+        return post.views + self.pending(post.pk)
+
+    def flush(self):
+        """Apply all pending hits; returns the number of views written."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        by_increment = defaultdict(list)
+        for post_id, hits in batch.items():
+            by_increment[hits].append(post_id)
+
+        try:
+            with transaction.atomic():
+                for hits, post_ids in by_increment.items():
+                    for start in range(0, len(post_ids), UPDATE_BATCH_SIZE):
+                        Post.objects.filter(
+                            pk__in=post_ids[start : start + UPDATE_BATCH_SIZE]
+                        ).update(views=F("views") + hits)
+                trending.record_views(batch)
+        except DatabaseError:
+            logger.exception("Could not flush %d post view counts", len(batch))
+            with self._lock:
+                self._pending.update(batch)
+            return 0
+
+        views = sum(batch.values())
+        stats.views_flushed(views)
+        return views
+
+    def start(self):
+        if self._flusher is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._stopping.clear()
+                self._flusher = threading.Thread(
+                    target=self._run, name="blog-view-counter", daemon=True
+                )
+                self._flusher.start()
+
+    def stop(self):
+        """Stop the flusher thread and write out whatever is still pending."""
+        flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            self._stopping.set()
+            flusher.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.flush()
+            close_old_connections()
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.stop)
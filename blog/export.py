@@ -0,0 +1,125 @@
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+
+from .models import Post
+
+CONTENT_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+FORMATS = tuple(CONTENT_TYPES)
+FIELDS = [
+    "id",
+    "title",
+    "author",
+    "author_name",
+    "category",
+    "tags",
+    "excerpt",
+    "content",
+    "published",
+    "is_featured",
+    "views",
+    "reading_time",
+    "created_at",
+]
+CHUNK_SIZE = 2000
+# Lines are joined into blocks of about this many bytes before being yielded,
+# so the response isn't written one tiny line at a time.
+BLOCK_SIZE = 64 * 1024
+
+
+def export_queryset():
+    return (
+        Post.objects.select_related("author", "category")
+        .prefetch_related("tags")
+        .order_by("pk")
+    )
+
+
+def post_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict per post. Posts are fetched ``chunk_size`` at a time and
+    the tags of each chunk are prefetched with a single query.
+    """
+    if queryset is None:
+        queryset = export_queryset()
+    for post in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": post.pk,
+            "title": post.title,
+            "author": post.author.username,
+            "author_name": post.author.get_full_name(),
+            "category": post.category.name if post.category else None,
+            "tags": [tag.name for tag in post.tags.all()],
+            "excerpt": post.excerpt,
+            "content": post.content,
+            "published": post.published,
+            "is_featured": post.is_featured,
+            "views": post.views,
+            "reading_time": post.reading_time,
+            "created_at": post.created_at.isoformat(),
+        }
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+class Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row["tags"] = "|".join(row["tags"])
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def blocks(lines, size=BLOCK_SIZE):
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(block).encode()
+            block, length = [], 0
+    if block:
+        yield "".join(block).encode()
+
+
+def gzipped(chunks, level=6):
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_posts(format="jsonl", compress=False, queryset=None, chunk_size=CHUNK_SIZE):
+    """Return an iterator of bytes with every post in ``format``."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; expected one of {FORMATS}.")
+    lines = jsonl_lines if format == "jsonl" else csv_lines
+    output = blocks(lines(post_rows(queryset, chunk_size)))
+    return gzipped(output) if compress else output
+
+
+async def aiterate(chunks):
+    """
+    Iterate ``chunks`` from async code, pulling each one in the sync thread.
+    Django would otherwise read a sync iterator into a list before an ASGI
+    response sends its first byte.
+    """
+    chunks = iter(chunks)
+    done = object()
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        yield chunk
@@ -0,0 +1,233 @@
+"""
+Faceted filtering of post listings and search results by category, tag,
+author and reading time.
+
+Filters come from the query string (``?category=3&length=short``) and narrow
+the posts queryset, so they combine in SQL through the listing and tag
+indexes. The counts of every facet for the current result set come from one
+query: a ``UNION ALL`` of one grouped count per facet. The unfiltered listing
+reads them from the per-facet statistics instead (see
+``blog.stats.published_facets()``).
+"""
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+
+from . import pagecache
+from .models import Category, Post, Tag
+
+CATEGORY = "category"
+TAG = "tag"
+AUTHOR = "author"
+LENGTH = "length"
+FACETS = (CATEGORY, TAG, AUTHOR, LENGTH)
+
+# Reading time buckets: (value, label, from minutes, to minutes exclusive).
+LENGTHS = (
+    ("short", "Under 5 min", None, 5),
+    ("medium", "5–10 min", 5, 11),
+    ("long", "Over 10 min", 11, None),
+)
+# Values shown per facet, most posts first.
+MAX_VALUES = 10
+# Paging parameters, dropped when the filters change.
+PAGE_PARAMS = ("cursor", "page")
+CACHE_PREFIX = "blog:facets:"
+
+
+def parse_filters(params):
+    """The valid facet filters in ``params``, as ``{facet: value}``."""
+    filters = {}
+    for facet in (CATEGORY, TAG, AUTHOR):
+        if params.get(facet, "").isdigit():
+            filters[facet] = params[facet]
+    if params.get(LENGTH) in {value for value, *_ in LENGTHS}:
+        filters[LENGTH] = params[LENGTH]
+    return filters
+
+
+def length_of(reading_time):
+    """The ``LENGTHS`` value a reading time falls in."""
+    for value, _, start, end in LENGTHS:
+        if (start is None or reading_time >= start) and (end is None or reading_time < end):
+            return value
+
+
+def length_range(value):
+    for length, _, start, end in LENGTHS:
+        if length == value:
+            return {
+                **({"reading_time__gte": start} if start is not None else {}),
+                **({"reading_time__lt": end} if end is not None else {}),
+            }
+    return {}
+
+
+def filter_posts(posts, filters):
+    """Narrow the ``posts`` queryset to ``filters``."""
+    if CATEGORY in filters:
+        posts = posts.filter(category_id=filters[CATEGORY])
+    if AUTHOR in filters:
+        posts = posts.filter(author_id=filters[AUTHOR])
+    if TAG in filters:
+        posts = posts.filter(tags__id=filters[TAG])
+    if LENGTH in filters:
+        posts = posts.filter(**length_range(filters[LENGTH]))
+    return posts
+
+
+FACET_SQL = """
+WITH results AS ({results})
+SELECT %s, CAST(g.id AS text), c.{name}, g.n
+FROM (SELECT category_id AS id, COUNT(*) AS n FROM results GROUP BY category_id) g
+JOIN {category} c ON c.id = g.id
+UNION ALL
+SELECT %s, CAST(g.id AS text), u.{username}, g.n
+FROM (SELECT author_id AS id, COUNT(*) AS n FROM results GROUP BY author_id) g
+JOIN {user} u ON u.id = g.id
+UNION ALL
+SELECT %s, CAST(g.id AS text), t.{name}, g.n
+FROM (
+    SELECT tag_id AS id, COUNT(*) AS n FROM {post_tags}
+    WHERE post_id IN (SELECT id FROM results) GROUP BY tag_id
+) g
+JOIN {tag} t ON t.id = g.id
+UNION ALL
+SELECT %s, {length}, '', COUNT(*) FROM results GROUP BY 2
+"""
+
+
+def length_case():
+    """SQL (and params) bucketing ``reading_time`` into ``LENGTHS``."""
+    whens, params = [], []
+    for value, _, start, end in LENGTHS:
+        bounds = []
+        if start is not None:
+            bounds.append("reading_time >= %s")
+            params.append(start)
+        if end is not None:
+            bounds.append("reading_time < %s")
+            params.append(end)
+        whens.append(f"WHEN {' AND '.join(bounds)} THEN %s")
+        params.append(value)
+    return f"CASE {' '.join(whens)} END", params
+
+
+def facet_query(posts):
+    """
+    SQL and params counting ``posts`` per value of every facet in one pass:
+    the result set is selected once, as a CTE, and grouped per facet.
+    """
+    results, params = (
+        posts.order_by()
+        .values("id", "category_id", "author_id", "reading_time")
+        .query.sql_with_params()
+    )
+    quote = connection.ops.quote_name
+    length, length_params = length_case()
+    sql = FACET_SQL.format(
+        results=results,
+        category=quote(Category._meta.db_table),
+        tag=quote(Tag._meta.db_table),
+        user=quote(User._meta.db_table),
+        post_tags=quote(Post.tags.through._meta.db_table),
+        name=quote("name"),
+        username=quote("username"),
+        length=length,
+    )
+    # Placeholders in order: results, then each facet's name.
+    return sql, [
+        *params,
+        CATEGORY,
+        AUTHOR,
+        TAG,
+        LENGTH,
+        *length_params,
+    ]
+
+
+class Facets:
+    """Facet counts of a result set, with links to narrow or widen it."""
+
+    def __init__(self, rows, params):
+        self.params = params
+        self.filters = parse_filters(params)
+        self.values = {facet: [] for facet in FACETS}
+        for facet, value, label, count in rows:
+            if value is None:
+                # Uncategorized posts: nothing to filter by.
+                continue
+            selected = self.filters.get(facet) == value
+            self.values[facet].append(
+                {
+                    "value": value,
+                    "label": label,
+                    "count": count,
+                    "selected": selected,
+                    "url": self.url(facet, None if selected else value),
+                }
+            )
+        order = {value: i for i, (value, *_) in enumerate(LENGTHS)}
+        labels = {value: label for value, label, *_ in LENGTHS}
+        for item in self.values[LENGTH]:
+            item["label"] = labels[item["value"]]
+        self.values[LENGTH].sort(key=lambda item: order[item["value"]])
+        for facet in (CATEGORY, TAG, AUTHOR):
+            self.values[facet].sort(key=lambda item: (-item["count"], item["label"]))
+
+    def url(self, facet, value):
+        """
+        The current query string with ``facet`` set to ``value`` (or cleared
+        if ``None``), back on the first page.
+        """
+        params = self.params.copy()
+        for name in (facet, *PAGE_PARAMS):
+            params.pop(name, None)
+        if value is not None:
+            params[facet] = value
+        return "?" + params.urlencode()
+
+    @property
+    def total(self):
+        """Posts in the result set: each is in exactly one length bucket."""
+        return sum(item["count"] for item in self.values[LENGTH])
+
+    def groups(self):
+        """``[(facet, values)]`` to show, the selected value always included."""
+        groups = []
+        for facet in FACETS:
+            values = self.values[facet]
+            shown = values[:MAX_VALUES]
+            shown += [item for item in values[MAX_VALUES:] if item["selected"]]
+            if shown:
+                groups.append((facet, shown))
+        return groups
+
+
+def facets(posts, params):
+    """
+    The ``Facets`` of ``posts``, filtered by the query string ``params``.
+
+    Every page of a listing shares its counts, so they are cached until a
+    post changes (the page cache's ``posts`` tag), or for at most
+    ``BLOG_PAGE_CACHE_TIMEOUT`` seconds, as retagging doesn't bump that tag.
+    """
+    sql, sql_params = facet_query(posts)
+    version = pagecache.tag_version(pagecache.POSTS)
+    key = CACHE_PREFIX + hashlib.md5(f"{version}|{sql}|{sql_params!r}".encode()).hexdigest()
+    rows = cache.get(key)
+    if rows is None:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, sql_params)
+            rows = cursor.fetchall()
+        cache.set(key, rows, settings.BLOG_PAGE_CACHE_TIMEOUT)
+    return Facets(rows, params)
+
+
+async def afacets(posts, params):
+    return await sync_to_async(facets)(posts, params)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = "Recompute every post's related posts from tag overlap."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=related.RELATED_POSTS,
+            help="Related posts to keep per post.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = related.rebuild(options["top"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {stored:,} related posts in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank trending posts from their recent hourly views and replace the "
+        "trending snapshot. Meant to run on a schedule, e.g. every 10 minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            help="Posts to keep site-wide and per category (BLOG_TRENDING_SIZE).",
+        )
+        parser.add_argument(
+            "--half-life",
+            type=float,
+            help="Hours after which views count half (BLOG_TRENDING_HALF_LIFE_HOURS).",
+        )
+        parser.add_argument(
+            "--window",
+            type=int,
+            help="Hours of views to keep and rank by (BLOG_TRENDING_WINDOW_HOURS).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = trending.rebuild(options["top"], options["half_life"], options["window"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {stored:,} trending places in {time.perf_counter() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every post with its author, category and tags as JSON lines "
+        "or CSV, optionally gzip-compressed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="jsonl")
+        parser.add_argument(
+            "--output", "-o", help="File to write to; defaults to standard output."
+        )
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+        parser.add_argument(
+            "--published-only", action="store_true", help="Skip draft posts."
+        )
+
+    def handle(self, *args, **options):
+        queryset = export.export_queryset()
+        if options["published_only"]:
+            queryset = queryset.filter(published=True)
+        chunks = export.export_posts(
+            options["format"], options["gzip"], queryset, options["chunk_size"]
+        )
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+            else:
+                output.flush()
+
+        if options["output"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote {written:,} bytes to {options['output']}.")
+            )
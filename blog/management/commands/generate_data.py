@@ -0,0 +1,268 @@
+import math
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils.functional import cached_property
+from django.utils.text import slugify
+
+from blog import autocomplete, related, rendering, search, stats
+from blog.models import (
+    AuthorProfile,
+    Category,
+    Post,
+    PostViewBucket,
+    RelatedPost,
+    SearchTerm,
+    SiteStatistic,
+    Tag,
+    TrendingPost,
+)
+
+CATEGORY_NAMES = [
+    "Technology",
+    "Self-Improvement",
+    "Design",
+    "Business",
+    "Lifestyle",
+    "Health",
+    "Career",
+]
+
+TAG_NAMES = [
+    "Django",
+    "Python",
+    "Web Development",
+    "Productivity",
+    "Habits",
+    "UI",
+    "UX",
+    "Machine Learning",
+    "AI",
+    "Backend",
+    "API",
+    "Business",
+    "Finance",
+    "Reading",
+    "Health",
+    "Projects",
+]
+
+FIRST_NAMES = [
+    "Sarah", "Michael", "Emma", "David", "Alex", "Nora", "James", "Sophia",
+    "Chris", "Omar", "Laila", "Youssef", "Mona", "Karim", "Hana", "Tarek",
+]
+LAST_NAMES = [
+    "Smith", "Hassan", "Brown", "Ali", "Garcia", "Ibrahim", "Miller", "Nasser",
+    "Davis", "Fouad", "Wilson", "Saleh", "Moore", "Adel", "Taylor", "Samir",
+]
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from or "
+    "an at which but not have all can more one about their will would there "
+    "code data web design build learn team users model query page server "
+    "python django api cache index test deploy scale habit focus growth "
+    "health career money travel reading project product market simple fast "
+    "clean idea story write daily better modern guide tips mistakes power"
+).split()
+
+# Generating text word by word dominates the run time, so every post body is
+# a slice of one pre-generated corpus instead.
+CORPUS_WORDS = 200_000
+PARAGRAPH_BREAK = "\x00"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic authors, categories, tags and posts for load "
+        "testing, with bulk inserts in fixed-size chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--authors", type=int, default=50)
+        parser.add_argument("--categories", type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument("--tags", type=int, default=len(TAG_NAMES))
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete all posts, categories, tags and non-superusers first.",
+        )
+        parser.add_argument(
+            "--skip-index",
+            action="store_true",
+            help="Don't render posts or rebuild the search index and statistics afterwards.",
+        )
+        parser.add_argument(
+            "--related",
+            action="store_true",
+            help=(
+                "Also compute related posts afterwards. This holds every post's "
+                "tags in memory; at scale, run compute_related_posts separately."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        started = time.perf_counter()
+
+        if options["clear"]:
+            self.clear()
+
+        authors = self.create_authors(options["authors"])
+        categories = self.create_named(Category, CATEGORY_NAMES, options["categories"])
+        tags = self.create_named(Tag, TAG_NAMES, options["tags"])
+        rows = self.create_posts(options["posts"], authors, categories, tags)
+        # Bulk inserts skip the signals that keep search suggestions current.
+        autocomplete.invalidate()
+
+        if not options["skip_index"]:
+            self.stdout.write("Rendering posts, rebuilding statistics and search index...")
+            rendering.backfill(Post.objects.unrendered())
+            stats.reconcile()
+            search.rebuild_index()
+        if options["related"]:
+            self.stdout.write("Computing related posts...")
+            related.rebuild()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {rows:,} rows in {elapsed:.1f}s "
+                f"({rows / elapsed:,.0f} rows/sec)."
+            )
+        )
+
+    def clear(self):
+        self.stdout.write("Clearing existing data...")
+        # Raw deletes: per-post signals, and the delete collector loading every
+        # post, would dominate at scale. What the signals maintain is rebuilt
+        # once instead.
+        with transaction.atomic():
+            for model in (
+                Post.tags.through,
+                RelatedPost,
+                PostViewBucket,
+                TrendingPost,
+                SearchTerm,
+                Post,
+                Category,
+                Tag,
+                SiteStatistic,
+            ):
+                queryset = model.objects.all()
+                queryset._raw_delete(queryset.db)
+            User.objects.exclude(is_superuser=True).delete()
+        stats.reconcile()
+        search.rebuild_index()
+
+    def create_authors(self, count):
+        offset = User.objects.aggregate(last=Max("id"))["last"] or 0
+        password = make_password("password123")
+        author_ids = []
+        for start in range(0, count, self.chunk_size):
+            numbers = range(
+                offset + start + 1, offset + min(start + self.chunk_size, count) + 1
+            )
+            users = [self.make_author(number, password) for number in numbers]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                AuthorProfile.objects.bulk_create(
+                    AuthorProfile(
+                        user=user,
+                        slug=slugify(f"{user.first_name} {user.last_name} {number}"),
+                    )
+                    for number, user in zip(numbers, users)
+                )
+            author_ids.extend(user.pk for user in users)
+        self.stdout.write(f"Created {len(author_ids):,} authors.")
+        return author_ids
+
+    def make_author(self, number, password):
+        return User(
+            username=f"author{number}",
+            first_name=self.random.choice(FIRST_NAMES),
+            last_name=self.random.choice(LAST_NAMES),
+            email=f"author{number}@example.com",
+            password=password,
+        )
+
+    def create_named(self, model, names, count):
+        names = (names + [f"{model.__name__} {n}" for n in range(len(names) + 1, count + 1)])[:count]
+        objects = [model(name=name) for name in names]
+        if model is Category:
+            for category in objects:
+                category.slug = slugify(category.name)
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        return list(model.objects.filter(name__in=names).values_list("pk", flat=True))
+
+    def create_posts(self, count, authors, categories, tags):
+        offset = Post.objects.aggregate(last=Max("id"))["last"] or 0
+        through = Post.tags.through
+        rows = 0
+        for start in range(0, count, self.chunk_size):
+            chunk_started = time.perf_counter()
+            posts = [
+                self.make_post(offset + n, authors, categories)
+                for n in range(start + 1, min(start + self.chunk_size, count) + 1)
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                links = [
+                    through(post_id=post.pk, tag_id=tag_id)
+                    for post in posts
+                    for tag_id in self.random.sample(tags, min(len(tags), self.random.randint(1, 4)))
+                ]
+                through.objects.bulk_create(links)
+
+            chunk_rows = len(posts) + len(links)
+            rows += chunk_rows
+            self.stdout.write(
+                f"  posts {start + len(posts):,}/{count:,}: "
+                f"{chunk_rows / (time.perf_counter() - chunk_started):,.0f} rows/sec"
+            )
+        return rows
+
+    def make_post(self, number, authors, categories):
+        words = max(50, int(self.random.lognormvariate(6.5, 0.6)))
+        title_words = self.random.sample(WORDS[30:], 4)
+        return Post(
+            title=f"{' '.join(title_words).title()} #{number}",
+            author_id=self.random.choice(authors),
+            category_id=self.random.choice(categories) if categories else None,
+            excerpt=self.text(self.random.randint(12, 30)),
+            content=self.text(words),
+            published=self.random.random() < 0.9,
+            is_featured=self.random.random() < 0.02,
+            views=int(self.random.paretovariate(1.2) * 10),
+            word_count=words,
+            reading_time=math.ceil(words / rendering.WORDS_PER_MINUTE),
+        )
+
+    @cached_property
+    def corpus(self):
+        """Paragraphs of random words that post bodies are sliced from."""
+        corpus = []
+        while len(corpus) < CORPUS_WORDS:
+            paragraph = self.random.choices(WORDS, k=self.random.randint(40, 120))
+            paragraph[0] = paragraph[0].capitalize()
+            paragraph[-1] += "."
+            corpus.extend(paragraph)
+            corpus.append(PARAGRAPH_BREAK)
+        return corpus
+
+    def text(self, words):
+        start = self.random.randrange(len(self.corpus) - words)
+        return (
+            " ".join(self.corpus[start : start + words])
+            .replace(f" {PARAGRAPH_BREAK} ", "\n\n")
+            # A slice can also start or end at a break.
+            .strip(f" {PARAGRAPH_BREAK}")
+        )
@@ -0,0 +1,299 @@
+import csv
+import gzip
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from blog import autocomplete, export, related, rendering, search, stats
+from blog.models import AuthorProfile, Category, Post, Tag
+
+# Post columns overwritten when a row's title already exists.
+UPDATE_FIELDS = [
+    "author",
+    "category",
+    "excerpt",
+    "content",
+    "published",
+    "is_featured",
+    "views",
+    "reading_time",
+    "word_count",
+    "content_html",
+    "updated_at",
+]
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def guess_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lstrip(".")
+    return extension if extension in export.FORMATS else None
+
+
+def to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def to_int(value):
+    return int(value) if value not in (None, "") else 0
+
+
+def tag_link_sql():
+    through = Post.tags.through
+    quote = connection.ops.quote_name
+    return "INSERT INTO {} ({}, {}) VALUES (%s, %s)".format(
+        quote(through._meta.db_table),
+        quote(through._meta.get_field("post").column),
+        quote(through._meta.get_field("tag").column),
+    )
+
+
+class LookupCache:
+    """Name -> pk map for a model, loaded once and filled in batches."""
+
+    def __init__(self, model, field="name"):
+        self.model = model
+        self.field = field
+        self.pks = dict(model.objects.values_list(field, "pk"))
+
+    def missing(self, names):
+        return {name for name in names if name and name not in self.pks}
+
+    def add(self, objects):
+        self.model.objects.bulk_create(objects, ignore_conflicts=True)
+        names = [getattr(obj, self.field) for obj in objects]
+        self.pks.update(
+            self.model.objects.filter(**{f"{self.field}__in": names}).values_list(
+                self.field, "pk"
+            )
+        )
+
+
+class SlugSet:
+    """Existing slugs of a model, so new ones can be made unique without a query each."""
+
+    def __init__(self, model, fallback):
+        self.fallback = fallback
+        self.taken = set(model.objects.values_list("slug", flat=True))
+
+    def claim(self, value, fallback=None):
+        base = slugify(value) or slugify(fallback or "") or self.fallback
+        slug, suffix = base, 2
+        while slug in self.taken:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        self.taken.add(slug)
+        return slug
+
+
+class Command(BaseCommand):
+    help = (
+        "Import posts from a JSON lines or CSV file (optionally gzipped) in the "
+        "format written by export_posts. Existing posts with the same title are "
+        "updated. Progress is checkpointed after every batch so an interrupted "
+        "import can be resumed by running the command again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=export.FORMATS)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file; defaults to <path>.checkpoint next to the input.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first row.",
+        )
+        parser.add_argument(
+            "--skip-index",
+            action="store_true",
+            help="Don't render posts or rebuild the search index and statistics afterwards.",
+        )
+        parser.add_argument(
+            "--related",
+            action="store_true",
+            help=(
+                "Also compute related posts afterwards. This holds every post's "
+                "tags in memory; at scale, run compute_related_posts separately."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+        if format is None:
+            raise CommandError(f"Can't tell the format of {path}; pass --format.")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        done = 0 if options["restart"] else self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f"Resuming after {done:,} rows.")
+
+        self.authors = LookupCache(User, "username")
+        self.categories = LookupCache(Category)
+        self.tags = LookupCache(Tag)
+        self.author_slugs = SlugSet(AuthorProfile, "author")
+        self.category_slugs = SlugSet(Category, "category")
+
+        started = time.perf_counter()
+        imported = 0
+        with open_text(path) as f:
+            rows = islice(self.read_rows(f, format), done, None)
+            while batch := list(islice(rows, options["batch_size"])):
+                with transaction.atomic():
+                    self.import_batch(batch)
+                done += len(batch)
+                imported += len(batch)
+                self.write_checkpoint(checkpoint, done)
+                self.stdout.write(
+                    f"  {done:,} rows: "
+                    f"{imported / (time.perf_counter() - started):,.0f} posts/sec"
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        # Bulk inserts skip the signals that keep search suggestions current.
+        autocomplete.invalidate()
+
+        if not options["skip_index"]:
+            self.stdout.write("Rendering posts, rebuilding statistics and search index...")
+            rendering.backfill(Post.objects.unrendered())
+            stats.reconcile()
+            search.rebuild_index()
+        if options["related"]:
+            self.stdout.write("Computing related posts...")
+            related.rebuild()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported:,} posts in {elapsed:.1f}s "
+                f"({imported / elapsed if elapsed else 0:,.0f} posts/sec)."
+            )
+        )
+
+    def read_checkpoint(self, checkpoint):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return json.load(f)["rows"]
+
+    def write_checkpoint(self, checkpoint, rows):
+        # Replace atomically so a crash never leaves a truncated checkpoint.
+        with open(f"{checkpoint}.tmp", "w") as f:
+            json.dump({"rows": rows}, f)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    def read_rows(self, f, format):
+        if format == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                row["tags"] = [tag for tag in row.get("tags", "").split("|") if tag]
+                yield row
+
+    def import_batch(self, rows):
+        # A title repeated within one batch would be upserted twice in the same
+        # statement; the last occurrence wins, as it would across batches.
+        rows = list({row["title"]: row for row in rows}.values())
+        self.create_missing_authors(rows)
+        self.create_missing_categories(rows)
+        self.create_missing_tags(rows)
+
+        posts = [
+            Post(
+                title=row["title"],
+                author_id=self.authors.pks[row["author"]],
+                category_id=self.categories.pks.get(row.get("category")),
+                excerpt=row.get("excerpt"),
+                content=row.get("content"),
+                published=to_bool(row.get("published")),
+                is_featured=to_bool(row.get("is_featured")),
+                views=to_int(row.get("views")),
+                reading_time=to_int(row.get("reading_time")),
+                # Rendered after the import, see ``rendering.backfill()``.
+                content_html="",
+            )
+            for row in rows
+        ]
+        Post.objects.bulk_create(
+            posts,
+            update_conflicts=True,
+            unique_fields=["title"],
+            update_fields=UPDATE_FIELDS,
+        )
+
+        through = Post.tags.through
+        through.objects.filter(post_id__in=[post.pk for post in posts]).delete()
+        # There are several links per post, and building a model instance for
+        # each of them costs more than inserting it.
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                tag_link_sql(),
+                [
+                    (post.pk, self.tags.pks[name])
+                    for post, row in zip(posts, rows)
+                    for name in set(row.get("tags") or ())
+                ],
+            )
+
+    def create_missing_authors(self, rows):
+        names = {row["author"]: row.get("author_name") or "" for row in rows}
+        missing = self.authors.missing(names)
+        if not missing:
+            return
+        users = []
+        for username in sorted(missing):
+            first_name, _, last_name = names[username].partition(" ")
+            users.append(
+                User(
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=make_password(None),
+                )
+            )
+        self.authors.add(users)
+        AuthorProfile.objects.bulk_create(
+            AuthorProfile(
+                user_id=self.authors.pks[user.username],
+                slug=self.author_slugs.claim(user.get_full_name(), user.username),
+            )
+            for user in users
+        )
+
+    def create_missing_categories(self, rows):
+        missing = self.categories.missing({row.get("category") for row in rows})
+        if missing:
+            self.categories.add(
+                [
+                    Category(name=name, slug=self.category_slugs.claim(name))
+                    for name in sorted(missing)
+                ]
+            )
+
+    def create_missing_tags(self, rows):
+        missing = self.tags.missing(
+            {name for row in rows for name in row.get("tags") or ()}
+        )
+        if missing:
+            self.tags.add([Tag(name=name) for name in sorted(missing)])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from all published posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--optimize-only",
+            action="store_true",
+            help="Only merge the index segments, without re-reading the posts.",
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if not options["optimize_only"]:
+            backend.rebuild()
+            self.stdout.write(f"Rebuilt {type(backend).__name__} index.")
+        backend.optimize()
+        self.stdout.write(self.style.SUCCESS("Search index optimized."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the site statistics table and the category/tag post counts "
+        "from scratch."
+    )
+
+    def handle(self, *args, **options):
+        values = stats.reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciled {len(values)} statistics: "
+                f"{values[stats.PUBLISHED_POSTS]} published posts, "
+                f"{values[stats.ACTIVE_AUTHORS]} active authors, "
+                f"{values[stats.TOTAL_VIEWS]} views."
+            )
+        )
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import pagecache, rendering, stats
+from blog.models import Category, Post
+
+
+class Command(BaseCommand):
+    help = "Render posts' Markdown content and reading times in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render every post, not only those not rendered yet.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=rendering.CHUNK_SIZE,
+            help="Posts rendered and written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posts = Post.objects.all() if options["all"] else Post.objects.unrendered()
+        rendered = rendering.backfill(posts, options["workers"], options["chunk_size"])
+        # ``bulk_update`` skips the signals: recount the reading time statistics
+        # and expire the listings, whose cards show reading times.
+        stats.reconcile()
+        pagecache.invalidate(
+            pagecache.POSTS,
+            *(
+                pagecache.category_tag(pk)
+                for pk in Category.objects.values_list("pk", flat=True)
+            ),
+            *(
+                pagecache.author_tag(pk)
+                for pk in Post.objects.values_list("author_id", flat=True).distinct()
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {rendered:,} posts in {time.perf_counter() - started:.1f}s."
+            )
+        )
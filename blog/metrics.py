@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .querybudget import QueryRecorder, install, recording, uninstall
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_REQUEST_MAX_QUERIES = 50
+
+# The sample of the request being handled, for the template backend.
+current_sample = ContextVar("blog_metrics_sample", default=None)
+
+
+class RequestSample:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = QueryRecorder()
+        self.template_time = 0.0
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = defaultdict(int)  # (method, status) -> count
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency = 0.0
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+
+    @property
+    def count(self):
+        return sum(self.requests.values())
+
+
+class Registry:
+    """
+    In-process request metrics, keyed by URL name. Each worker process keeps
+    its own numbers; Prometheus sums them per instance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def record(self, view, method, status, latency, queries, query_time, template_time):
+        bucket = bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            stats = self.views[view]
+            stats.requests[method, status] += 1
+            if bucket < len(LATENCY_BUCKETS):
+                stats.buckets[bucket] += 1
+            stats.latency += latency
+            stats.queries += queries
+            stats.query_time += query_time
+            stats.template_time += template_time
+
+    def reset(self):
+        with self._lock:
+            self.views.clear()
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            views = sorted(self.views.items())
+            lines = [
+                "# HELP bloghub_requests_total Requests handled, by view, method and status.",
+                "# TYPE bloghub_requests_total counter",
+            ]
+            for view, stats in views:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'bloghub_requests_total{{view="{view}",method="{method}",'
+                        f'status="{status}"}} {count}'
+                    )
+
+            lines += [
+                "# HELP bloghub_request_duration_seconds Request latency, by view.",
+                "# TYPE bloghub_request_duration_seconds histogram",
+            ]
+            for view, stats in views:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'bloghub_request_duration_seconds_bucket{{view="{view}",'
+                        f'le="{bound}"}} {cumulative}'
+                    )
+                lines += [
+                    f'bloghub_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} '
+                    f"{stats.count}",
+                    f'bloghub_request_duration_seconds_sum{{view="{view}"}} {stats.latency:.6f}',
+                    f'bloghub_request_duration_seconds_count{{view="{view}"}} {stats.count}',
+                ]
+
+            for name, help_text, attribute, fmt in (
+                ("bloghub_db_queries_total", "SQL queries run", "queries", "d"),
+                ("bloghub_db_query_seconds_total", "Time spent in SQL", "query_time", ".6f"),
+                (
+                    "bloghub_template_render_seconds_total",
+                    "Time spent rendering templates",
+                    "template_time",
+                    ".6f",
+                ),
+            ):
+                lines += [f"# HELP {name} {help_text}, by view.", f"# TYPE {name} counter"]
+                for view, stats in views:
+                    lines.append(f'{name}{{view="{view}"}} {getattr(stats, attribute):{fmt}}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Record request count, latency, SQL query count and time, and template
+    render time per URL name into ``registry``, and log requests slower than
+    ``BLOG_SLOW_REQUEST_THRESHOLD`` seconds with their SQL.
+
+    Enabled by ``BLOG_METRICS_ENABLED``. Template time is only measured when
+    the ``blog.metrics.DjangoTemplates`` template backend is used.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.BLOG_METRICS_ENABLED:
+            return self.get_response(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        try:
+            with recording(sample.queries):
+                response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        self.finish(request, response, sample)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.BLOG_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        # As in QueryBudgetMiddleware, the async ORM's queries run on the
+        # request's thread-sensitive executor thread and its connections.
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        await sync_to_async(install)(sample.queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(uninstall)(sample.queries)
+            current_sample.reset(token)
+        self.finish(request, response, sample)
+        return response
+
+    def finish(self, request, response, sample):
+        latency = time.perf_counter() - sample.started
+        view = view_name(request)
+        registry.record(
+            view,
+            request.method,
+            response.status_code,
+            latency,
+            len(sample.queries),
+            sample.queries.duration,
+            sample.template_time,
+        )
+        if latency >= settings.BLOG_SLOW_REQUEST_THRESHOLD:
+            queries = sample.queries.queries
+            logger.warning(
+                "Slow request: %s %s (%s) took %.0fms: %d queries in %.0fms, "
+                "templates %.0fms\n%s",
+                request.method,
+                request.get_full_path(),
+                view,
+                latency * 1000,
+                len(queries),
+                sample.queries.duration * 1000,
+                sample.template_time * 1000,
+                "\n".join(
+                    f"  {duration * 1000:7.2f}ms  {sql}"
+                    for sql, duration in queries[:SLOW_REQUEST_MAX_QUERIES]
+                ),
+            )
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        sample = current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing renders for ``MetricsMiddleware``."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
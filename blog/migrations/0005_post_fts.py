@@ -0,0 +1,51 @@
+from django.db import migrations
+
+POPULATE_FTS_SQL = """
+INSERT INTO blog_post_fts (rowid, title, excerpt, content, tags, category, author)
+SELECT
+    p.id,
+    p.title,
+    COALESCE(p.excerpt, ''),
+    COALESCE(p.content, ''),
+    COALESCE(
+        (
+            SELECT group_concat(t.name, ' ')
+            FROM blog_post_tags pt JOIN blog_tag t ON t.id = pt.tag_id
+            WHERE pt.post_id = p.id
+        ),
+        ''
+    ),
+    COALESCE(c.name, ''),
+    u.first_name || ' ' || u.last_name || ' ' || u.username
+FROM blog_post p
+JOIN auth_user u ON u.id = p.author_id
+LEFT JOIN blog_category c ON c.id = p.category_id
+WHERE p.published
+"""
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE blog_post_fts USING fts5("
+        "title, excerpt, content, tags, category, author, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(POPULATE_FTS_SQL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS blog_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_searchterm"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def dedupe(base, taken):
+    slug, suffix = base, 2
+    while slug in taken:
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    taken.add(slug)
+    return slug
+
+
+def populate_slugs(apps, schema_editor):
+    Category = apps.get_model("blog", "Category")
+    AuthorProfile = apps.get_model("blog", "AuthorProfile")
+    User = apps.get_model("auth", "User")
+
+    taken = set()
+    for category in Category.objects.order_by("pk"):
+        category.slug = dedupe(slugify(category.name) or "category", taken)
+        category.save(update_fields=["slug"])
+
+    taken = set()
+    AuthorProfile.objects.bulk_create(
+        AuthorProfile(
+            user=user,
+            slug=dedupe(
+                slugify(f"{user.first_name} {user.last_name}")
+                or slugify(user.username)
+                or "user",
+                taken,
+            ),
+        )
+        for user in User.objects.order_by("pk")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_post_created_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name="AuthorProfile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("slug", models.SlugField(max_length=150, unique=True)),
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="profile", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(populate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(max_length=100, unique=True),
+        ),
+    ]
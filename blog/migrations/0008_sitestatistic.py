@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def compute_statistics(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    SiteStatistic = apps.get_model("blog", "SiteStatistic")
+
+    published = Post.objects.filter(published=True).order_by()
+    authors = dict(published.values_list("author_id").annotate(n=Count("id")))
+    categories = dict(
+        published.filter(category__isnull=False)
+        .values_list("category_id")
+        .annotate(n=Count("id"))
+    )
+    values = {
+        "published_posts": published.count(),
+        "active_authors": len(authors),
+        "total_views": Post.objects.aggregate(total=Sum("views"))["total"] or 0,
+        **{f"author:{pk}": n for pk, n in authors.items()},
+        **{f"category:{pk}": n for pk, n in categories.items()},
+    }
+    SiteStatistic.objects.bulk_create(
+        SiteStatistic(key=key, value=value) for key, value in values.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_category_slug_authorprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(compute_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_posts(apps, schema_editor):
+    Category = apps.get_model("blog", "Category")
+    Tag = apps.get_model("blog", "Tag")
+    Post = apps.get_model("blog", "Post")
+
+    Category.objects.update(
+        post_count=Coalesce(
+            Subquery(
+                Post.objects.filter(category=OuterRef("pk"))
+                .order_by()
+                .values("category")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        )
+    )
+    Tag.objects.update(
+        post_count=Coalesce(
+            Subquery(
+                Post.tags.through.objects.filter(tag=OuterRef("pk"))
+                .order_by()
+                .values("tag")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_sitestatistic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
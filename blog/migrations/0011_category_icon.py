@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+# The icons home.html and author_posts.html used to pick by category name.
+ICONS = {
+    "Technology": "💻",
+    "Design": "🎨",
+    "Self-Improvement": "🌟",
+    "Business": "💼",
+    "Lifestyle": "🌿",
+    "Health": "❤️",
+    "Career": "🚀",
+}
+
+
+def set_icons(apps, schema_editor):
+    Category = apps.get_model("blog", "Category")
+    for name, icon in ICONS.items():
+        Category.objects.filter(name=name).update(icon=icon)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0010_post_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="icon",
+            field=models.CharField(blank=True, help_text="An emoji shown on post cards.", max_length=16),
+        ),
+        migrations.RunPython(set_icons, migrations.RunPython.noop),
+    ]
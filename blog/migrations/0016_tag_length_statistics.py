@@ -0,0 +1,60 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+# ``blog.facets.LENGTHS`` when this migration was written: (value, from
+# minutes, to minutes exclusive).
+LENGTHS = (("short", None, 5), ("medium", 5, 11), ("long", 11, None))
+
+
+def length_filter(start, end):
+    return Q(
+        **({"reading_time__gte": start} if start is not None else {}),
+        **({"reading_time__lt": end} if end is not None else {}),
+    )
+
+
+def compute_statistics(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    SiteStatistic = apps.get_model("blog", "SiteStatistic")
+
+    published = Post.objects.filter(published=True).order_by()
+    tags = (
+        Post.tags.through.objects.filter(post__published=True)
+        .order_by()
+        .values_list("tag_id")
+        .annotate(n=Count("id"))
+    )
+    lengths = published.aggregate(
+        **{
+            f"length:{value}": Count("id", filter=length_filter(start, end))
+            for value, start, end in LENGTHS
+        }
+    )
+    values = {
+        **{f"tag:{pk}": n for pk, n in tags},
+        **{key: n for key, n in lengths.items() if n},
+    }
+    SiteStatistic.objects.filter(
+        Q(key__startswith="tag:") | Q(key__startswith="length:")
+    ).delete()
+    SiteStatistic.objects.bulk_create(
+        SiteStatistic(key=key, value=value) for key, value in values.items()
+    )
+
+
+def remove_statistics(apps, schema_editor):
+    SiteStatistic = apps.get_model("blog", "SiteStatistic")
+    SiteStatistic.objects.filter(
+        Q(key__startswith="tag:") | Q(key__startswith="length:")
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_rendered_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(compute_statistics, remove_statistics),
+    ]
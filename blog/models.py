@@ -2,9 +2,24 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 
+from . import rendering
+
+
+def unique_slug(model, value, fallback, exclude_pk=None):
+    base = slugify(value) or slugify(fallback) or model._meta.model_name
+    others = model.objects.exclude(pk=exclude_pk)
+    slug, suffix = base, 2
+    while others.filter(slug=slug).exists():
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    return slug
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=100, unique=True)
+    icon = models.CharField(max_length=16, blank=True, help_text="An emoji shown on post cards.")
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = "category"
@@ -14,9 +29,33 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Category, self.name, "category", self.pk)
+        super().save(*args, **kwargs)
+
+
+class AuthorProfile(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
+    slug = models.SlugField(max_length=150, unique=True)
+
+    def __str__(self):
+        return self.slug
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(
+                AuthorProfile,
+                f"{self.user.first_name} {self.user.last_name}",
+                self.user.username,
+                self.pk,
+            )
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = "tag"
@@ -27,6 +66,19 @@ class Tag(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def cards(self):
+        """
+        Posts loaded with just what listing cards show, with their author
+        and category. The unbounded ``content`` stays in the database.
+        """
+        return self.select_related("author", "category").only(*self.model.CARD_FIELDS)
+
+    def unrendered(self):
+        """Posts with content whose ``content_html`` hasn't been rendered yet."""
+        return self.filter(content_html="").exclude(content="").exclude(content=None)
+
+
 class Post(models.Model):
     title = models.CharField(max_length=255, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
@@ -37,13 +89,175 @@ class Post(models.Model):
     content = models.TextField(null=True, blank=True)
     published = models.BooleanField(default=False)
     created_at = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     tags = models.ManyToManyField(Tag, related_name="posts")
     views = models.IntegerField(default=0)
-    reading_time = models.IntegerField(default=0)
+    # Derived from ``content`` on save, see ``blog.rendering``.
+    reading_time = models.IntegerField(default=0, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    content_html = models.TextField(blank=True, editable=False)
     is_featured = models.BooleanField(default=False)
 
+    # Fields whose previous values signal handlers need to compute deltas.
+    TRACKED_FIELDS = (
+        "published",
+        "category_id",
+        "author_id",
+        "views",
+        "title",
+        "reading_time",
+    )
+    # Fields of the listing card projection, see ``PostQuerySet.cards()``.
+    CARD_FIELDS = (
+        "title",
+        "excerpt",
+        "published",
+        "is_featured",
+        "reading_time",
+        "created_at",
+        "author__username",
+        "category__name",
+        "category__slug",
+        "category__icon",
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        # Listings walk these newest first (see blog.pagination), so each one
+        # ends in the ordering columns. Public pages only show published
+        # posts; their indexes are partial so drafts don't bloat them.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(published=True),
+                name="post_published_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                condition=models.Q(published=True),
+                name="post_category_published_idx",
+            ),
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                condition=models.Q(published=True),
+                name="post_author_published_idx",
+            ),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_featured=True),
+                name="post_featured_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} Published by {self.author}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance.saved_state = {
+            field: loaded[field] for field in cls.TRACKED_FIELDS if field in loaded
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if "content" not in self.get_deferred_fields() and (
+            update_fields is None or "content" in update_fields
+        ):
+            for field, value in rendering.rendered_fields(self.content).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *rendering.RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+        self.saved_state = self.current_state()
+
+    def current_state(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+
+class RelatedPost(models.Model):
+    """One of a post's precomputed related posts (see ``blog.related``)."""
+
+    # Indexed by the unique (post, rank) constraint.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+", db_index=False)
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_to")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["post", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["post", "rank"], name="unique_related_post_rank")
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.2f})"
+
+
+class PostViewBucket(models.Model):
+    """Views of a post within one hour, fed by the view counter's flushes."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+", db_index=False)
+    hour = models.DateTimeField(db_index=True)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "hour"], name="unique_post_view_bucket")
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} @ {self.hour:%Y-%m-%d %H}:00: {self.views}"
+
+
+class TrendingPost(models.Model):
+    """
+    One place of a trending ranking (see ``blog.trending``): site-wide when
+    ``category`` is null, else within the category.
+    """
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="trending")
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, related_name="+", db_index=False
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["category", "rank"]
+        indexes = [models.Index(fields=["category", "rank"], name="trending_rank_idx")]
+
+    def __str__(self):
+        return f"#{self.rank} {self.post_id} ({self.score:.1f})"
+
+
+class SiteStatistic(models.Model):
+    key = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class SearchTerm(models.Model):
+    token = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["token", "post"], name="unique_search_term_per_post"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.post_id}"
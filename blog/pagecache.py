@@ -0,0 +1,223 @@
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+ENTRY_PREFIX = "blog:page:"
+LOCK_PREFIX = "blog:page-lock:"
+TAG_PREFIX = "blog:page-tag:"
+# Listings of all published posts: the home page and the posts page.
+POSTS = "posts"
+# The navbar, on every page (see blog.context_processors).
+NAV = "nav"
+
+
+def post_tag(post_id):
+    return f"post:{post_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def author_tag(author_id):
+    return f"author:{author_id}"
+
+
+def tag_tag(tag_id):
+    return f"tag:{tag_id}"
+
+
+def page_key(full_path):
+    return ENTRY_PREFIX + hashlib.md5(full_path.encode()).hexdigest()
+
+
+def page_cache(timeout=None, on_hit=None):
+    """
+    Serve the view (function or class) from the page cache for anonymous GET
+    requests.
+
+    ``on_hit(request, *args, **kwargs)`` runs when a request is answered
+    from the cache, for side effects the view would otherwise have had.
+    """
+
+    def decorator(view):
+        view.page_cache = {"timeout": timeout, "on_hit": on_hit}
+        return view
+
+    return decorator
+
+
+def get_page_cache(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_class or view_func, "page_cache", None)
+
+
+def tag(request, *tags):
+    """
+    Declare what the page being rendered shows, for invalidation. Call this
+    before reading the tagged data: the tags' versions are taken now, so a
+    change committed while the page renders still invalidates it.
+    """
+    if hasattr(request, "page_cache_tags"):
+        new = [name for name in tags if TAG_PREFIX + name not in request.page_cache_tags]
+        request.page_cache_tags.update(_tag_versions(new))
+
+
+def invalidate(*tags):
+    """Expire every cached page tagged with any of ``tags`` once committed."""
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def tag_version(name):
+    """The current version of one tag, e.g. to key a cache of its own."""
+    return _tag_versions([name])[TAG_PREFIX + name]
+
+
+def _bump(tags):
+    for name in set(tags):
+        key = TAG_PREFIX + name
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Never seen, or evicted: any fresh value invalidates old entries.
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def _tag_versions(tags):
+    """Current ``{tag key: version}`` of ``tags``."""
+    keys = [TAG_PREFIX + name for name in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def _has_messages(request):
+    storage = getattr(request, "_messages", None)
+    return storage is not None and (storage.used or len(storage) > 0)
+
+
+class PageCacheMiddleware:
+    """
+    Full-page cache for anonymous reads of views marked with ``@page_cache``.
+
+    Pages are keyed by path and query string and expire after
+    ``BLOG_PAGE_CACHE_TIMEOUT`` seconds or when one of their tags is
+    invalidated. An expired page is kept for ``BLOG_PAGE_CACHE_STALE``
+    seconds more: one request (holding a ``cache.add`` lock) regenerates it
+    while concurrent requests are served the stale copy.
+
+    Requests with a session (signed-in users) or pending messages and
+    responses that set cookies bypass the cache. Works with any Django cache backend.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if hasattr(request, "page_cache_key"):
+            self.store(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if hasattr(request, "page_cache_key"):
+            await sync_to_async(self.store)(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        options = get_page_cache(view_func)
+        if (
+            options is None
+            or not settings.BLOG_PAGE_CACHE_ENABLED
+            or request.method != "GET"
+            # Signed-in users have a session cookie. Asking ``request.user``
+            # would load the session and the user on every request.
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+            or _has_messages(request)
+        ):
+            return None
+
+        key = page_key(request.get_full_path())
+        entry = cache.get(key)
+        if entry is not None:
+            if self.is_fresh(entry):
+                state = "HIT"
+            elif cache.add(LOCK_PREFIX + key, 1, settings.BLOG_PAGE_CACHE_LOCK_TIMEOUT):
+                # This request regenerates the page.
+                request.page_cache_lock = LOCK_PREFIX + key
+                state = None
+            else:
+                state = "STALE"
+            if state is not None:
+                if options["on_hit"]:
+                    options["on_hit"](request, *view_args, **view_kwargs)
+                return self.cached_response(request, entry, state)
+
+        request.page_cache_key = key
+        request.page_cache_timeout = options["timeout"] or settings.BLOG_PAGE_CACHE_TIMEOUT
+        request.page_cache_tags = {}
+        return None
+
+    def is_fresh(self, entry):
+        if entry["expires"] < time.time():
+            return False
+        return cache.get_many(list(entry["tags"])) == entry["tags"]
+
+    def cached_response(self, request, entry, state):
+        response = HttpResponse(entry["content"], status=entry["status"])
+        for header, value in entry["headers"]:
+            response.headers[header] = value
+        response.headers["X-Page-Cache"] = state
+        last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+        return (
+            get_conditional_response(
+                request,
+                etag=response.get("ETag"),
+                last_modified=last_modified,
+                response=response,
+            )
+            or response
+        )
+
+    def store(self, request, response):
+        key = request.page_cache_key
+        try:
+            if (
+                response.status_code != 200
+                or response.streaming
+                or response.cookies
+                or "private" in response.get("Cache-Control", "")
+                or _has_messages(request)
+            ):
+                return
+            timeout = request.page_cache_timeout
+            entry = {
+                "content": response.content,
+                "status": response.status_code,
+                "headers": list(response.items()),
+                "tags": request.page_cache_tags,
+                "expires": time.time() + timeout,
+            }
+            cache.set(key, entry, timeout=timeout + settings.BLOG_PAGE_CACHE_STALE)
+            response.headers["X-Page-Cache"] = "MISS"
+        finally:
+            if hasattr(request, "page_cache_lock"):
+                cache.delete(request.page_cache_lock)
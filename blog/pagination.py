@@ -0,0 +1,129 @@
+import base64
+import binascii
+from datetime import date
+
+from django.db.models import Q
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(direction, post):
+    raw = f"{direction}|{post.created_at.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(direction, created_at, pk)``, or ``None`` for a bad token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        direction, created_at, pk = raw.split("|")
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, date.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, count=None):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page:
+            return encode_cursor(NEXT, self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page:
+            return encode_cursor(PREVIOUS, self.object_list[0])
+        return None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over ``(-created_at, -id)``.
+
+    Every page is a single ``LIMIT per_page + 1`` range query on the
+    ``(created_at, id)`` index, so page N costs the same as page 1.
+    ``count`` is optional and is never computed here: pass a cached value.
+    """
+
+    def __init__(self, queryset, per_page, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count = count
+
+    def query(self, token=None):
+        """Return ``(queryset, direction)`` for the page after/before ``token``."""
+        direction, created_at, pk = decode_cursor(token) or (None, None, None)
+        if direction is None:
+            queryset = self.queryset.order_by("-created_at", "-id")
+        # The redundant ``created_at`` bound lets SQLite seek into the index
+        # instead of walking it from the start; it can't use the OR for that.
+        elif direction == NEXT:
+            queryset = self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+                created_at__lte=created_at,
+            ).order_by("-created_at", "-id")
+        else:
+            queryset = self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk),
+                created_at__gte=created_at,
+            ).order_by("created_at", "id")
+        return queryset[: self.per_page + 1], direction
+
+    def make_page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction is None:
+            return KeysetPage(rows, more, False, self.count)
+        if direction == NEXT:
+            return KeysetPage(rows, more, True, self.count)
+        return KeysetPage(rows[::-1], True, more, self.count)
+
+    def page(self, token=None):
+        queryset, direction = self.query(token)
+        return self.make_page(list(queryset), direction)
+
+    async def apage(self, token=None):
+        queryset, direction = self.query(token)
+        return self.make_page([row async for row in queryset], direction)
+
+
+class KeysetPaginationMixin:
+    """Keyset pagination for ``ListView``; the page is exposed as ``page_obj``."""
+
+    cursor_kwarg = "cursor"
+
+    def get_pagination_count(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset, page_size, count=self.get_pagination_count()
+        )
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,177 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# ``IN (%s, %s, ...)`` lists vary in length with the data; fold them so the
+# same query over different id batches has the same shape.
+IN_LIST_RE = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+# Transaction control: ``BEGIN`` for an outermost ``atomic()`` block, or
+# savepoints when blocks nest (e.g. inside a test's transaction). It isn't
+# work the view asked for, and differs between the two, so budgets ignore it.
+TRANSACTION_RE = re.compile(
+    r"^\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT)\b", re.I
+)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_shape(sql):
+    return IN_LIST_RE.sub("(...)", sql)
+
+
+class QueryRecorder:
+    """Execute wrapper that records every query; see ``recording()``."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if TRANSACTION_RE.match(sql):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeated_shapes(self, threshold):
+        """Query shapes issued at least ``threshold`` times: likely N+1s."""
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    def problems(self, budget=None, repeat_threshold=None):
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f"{len(self)} queries exceed the budget of {budget}")
+        if repeat_threshold:
+            for shape, count in self.repeated_shapes(repeat_threshold).items():
+                problems.append(f"N+1: {count} x {shape}")
+        return problems
+
+
+def install(recorder):
+    """Record this thread's queries on every database alias with ``recorder``."""
+    for connection in connections.all():
+        connection.execute_wrappers.append(recorder)
+
+
+def uninstall(recorder):
+    for connection in connections.all():
+        connection.execute_wrappers.remove(recorder)
+
+
+@contextmanager
+def recording(recorder):
+    install(recorder)
+    try:
+        yield recorder
+    finally:
+        uninstall(recorder)
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may run per request."""
+
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+def get_query_budget(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_class or view_func, "query_budget", None)
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, repeat_threshold=None):
+    """
+    Fail if the block runs more than ``max_queries`` queries or repeats one
+    query shape ``repeat_threshold`` times or more.
+    """
+    if repeat_threshold is None:
+        repeat_threshold = settings.BLOG_QUERY_BUDGET_REPEAT_THRESHOLD
+    with recording(QueryRecorder()) as recorder:
+        yield recorder
+    problems = recorder.problems(max_queries, repeat_threshold)
+    if problems:
+        raise AssertionError(
+            "\n".join(problems + ["Queries:"] + [sql for sql, _ in recorder.queries])
+        )
+
+
+class QueryBudgetMiddleware:
+    """
+    Development/test middleware that checks every request against the budget
+    declared with ``@query_budget`` (or ``query_budget`` on a class-based view)
+    and flags repeated query shapes.
+
+    Enabled by ``BLOG_QUERY_BUDGET_ENABLED``; violations are logged, or raised
+    as ``QueryBudgetExceeded`` when ``BLOG_QUERY_BUDGET_RAISE`` is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.BLOG_QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+
+        with recording(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.BLOG_QUERY_BUDGET_ENABLED:
+            return await self.get_response(request)
+
+        # The async ORM runs queries on the request's thread-sensitive executor
+        # thread, whose connections are not the ones seen from the event loop.
+        recorder = QueryRecorder()
+        await sync_to_async(install)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(uninstall)(recorder)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        problems = recorder.problems(
+            getattr(request, "query_budget", None),
+            settings.BLOG_QUERY_BUDGET_REPEAT_THRESHOLD,
+        )
+        if problems:
+            message = f"{request.method} {request.path}: " + "; ".join(problems)
+            if settings.BLOG_QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func)
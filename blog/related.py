@@ -0,0 +1,236 @@
+"""
+Related posts by tag overlap.
+
+Two posts are as related as the Jaccard similarity of their tag sets,
+|A ∩ B| / |A ∪ B|, ties going to the newer post. The top ``RELATED_POSTS``
+published neighbours of every post are precomputed into ``RelatedPost`` by
+``rebuild()`` (the ``compute_related_posts`` command) and kept current for
+retagged posts by ``refresh_posts()``, once their transaction commits.
+
+The similarity of two posts depends only on their tag sets, and there are
+far fewer distinct tag sets than posts, so ``rank()`` compares tag sets
+through an inverted index of tag -> tag sets and then hands each post the
+newest posts of its most similar sets. The batch job ranks every post;
+a refresh loads only the newest ``CANDIDATES_PER_TAG`` posts of each tag of
+the retagged ones, so its cost doesn't grow with the corpus. Older posts
+can be missed until the next rebuild.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from itertools import chain, groupby, islice
+from threading import local
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from . import conditional, pagecache
+from .models import Post, RelatedPost
+
+RELATED_POSTS = 5
+BATCH_SIZE = 5000
+# Posts of each tag, newest first, that a refresh ranks retagged posts against.
+CANDIDATES_PER_TAG = 1000
+
+# Posts waiting for their transaction to commit, see ``schedule_refresh()``.
+_pending = local()
+
+
+def related_posts(post_id):
+    """Card projections of the published posts related to ``post_id``, best first."""
+    return (
+        Post.objects.filter(related_to__post_id=post_id, published=True)
+        .cards()
+        .order_by("related_to__rank")
+    )
+
+
+def tag_sets(post_ids=None):
+    """``{post id: frozenset of tag ids}`` of posts with at least one tag."""
+    links = Post.tags.through.objects.order_by().values_list("post_id", "tag_id")
+    if post_ids is None:
+        batches = [links.iterator(BATCH_SIZE)]
+    else:
+        post_ids = list(post_ids)
+        batches = (
+            links.filter(post_id__in=post_ids[start : start + BATCH_SIZE])
+            for start in range(0, len(post_ids), BATCH_SIZE)
+        )
+    tags = defaultdict(list)
+    for post_id, tag_id in chain.from_iterable(batches):
+        tags[post_id].append(tag_id)
+    return {post_id: frozenset(ids) for post_id, ids in tags.items()}
+
+
+def published_recency(posts):
+    """``{post id: place}`` of the published ``posts``, newest first."""
+    # The order ties are broken in.
+    published = posts.filter(published=True).order_by("-created_at", "-id")
+    return {
+        post_id: i
+        for i, post_id in enumerate(published.values_list("pk", flat=True).iterator(BATCH_SIZE))
+    }
+
+
+def rank(targets, tags_of, recency, k=RELATED_POSTS):
+    """
+    ``{post id: [(related post id, score), ...]}`` for the ``{post id: tag
+    set}`` ``targets``, among the published posts in ``recency`` whose tag
+    sets are in ``tags_of``.
+    """
+    posts_by_set = defaultdict(list)
+    for post_id in sorted(recency, key=recency.get):
+        if post_id in tags_of:
+            posts_by_set[tags_of[post_id]].append(post_id)
+    sets_by_tag = defaultdict(list)
+    for tag_set in posts_by_set:
+        for tag_id in tag_set:
+            sets_by_tag[tag_id].append(tag_set)
+
+    neighbours_of_set = {}
+    for tag_set in set(targets.values()):
+        shared = Counter(chain.from_iterable(sets_by_tag[t] for t in tag_set))
+        scored = (
+            (count / (len(tag_set) + len(other) - count), other)
+            for other, count in shared.items()
+        )
+        # Enough of the best sets to fill k places even after dropping the
+        # post itself; each set holds at least one post.
+        best = heapq.nlargest(
+            k + 1, scored, key=lambda item: (item[0], -recency[posts_by_set[item[1]][0]])
+        )
+        candidates = [
+            (score, post_id)
+            for score, other in best
+            for post_id in posts_by_set[other][: k + 1]
+        ]
+        candidates.sort(key=lambda item: (-item[0], recency[item[1]]))
+        neighbours_of_set[tag_set] = candidates[: k + 1]
+
+    return {
+        post_id: [
+            (other, score) for score, other in neighbours_of_set[tag_set] if other != post_id
+        ][:k]
+        for post_id, tag_set in targets.items()
+    }
+
+
+def compute(k=RELATED_POSTS):
+    """``{post id: [(related post id, score), ...]}`` for every tagged post."""
+    tags_of = tag_sets()
+    return rank(tags_of, tags_of, published_recency(Post.objects.all()), k)
+
+
+def neighbours(post_ids, k=RELATED_POSTS, candidates=CANDIDATES_PER_TAG):
+    """
+    ``compute()`` for ``post_ids`` only, approximately: they are ranked
+    against the newest ``candidates`` published posts of each of their tags,
+    with one query per tag for the whole batch.
+    """
+    targets = tag_sets(post_ids)
+    created = {}
+    for tag_id in set().union(*targets.values()):
+        # Walks the published listing index newest first, stopping at the limit.
+        tagged = Post.tags.through.objects.filter(post_id=OuterRef("pk"), tag_id=tag_id)
+        created.update(
+            Post.objects.filter(Exists(tagged), published=True)
+            .order_by("-created_at", "-id")
+            .values_list("pk", "created_at")[:candidates]
+        )
+    newest_first = sorted(created, key=lambda pk: (created[pk], pk), reverse=True)
+    recency = {post_id: i for i, post_id in enumerate(newest_first)}
+    return rank(targets, tag_sets(recency), recency, k)
+
+
+def insert_sql():
+    quote = connection.ops.quote_name
+    columns = ("post_id", "related_id", "rank", "score")
+    return "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(RelatedPost._meta.db_table),
+        ", ".join(quote(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+
+
+def related_rows(post_id, neighbours):
+    return [
+        (post_id, other, rank, score)
+        for rank, (other, score) in enumerate(neighbours, start=1)
+    ]
+
+
+def store(rows):
+    """Insert ``(post_id, related_id, rank, score)`` rows; returns how many."""
+    stored = 0
+    # Half a million model instances would cost more than inserting them.
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, BATCH_SIZE)):
+            cursor.executemany(insert_sql(), batch)
+            stored += len(batch)
+    return stored
+
+
+def changed_posts(related):
+    """Ids of posts whose stored related posts differ from ``related``."""
+    changed, seen = [], set()
+    stored = RelatedPost.objects.order_by("post_id", "rank").values_list("post_id", "related_id")
+    for post_id, rows in groupby(stored.iterator(BATCH_SIZE), key=lambda row: row[0]):
+        seen.add(post_id)
+        if [other for _, other in rows] != [other for other, _ in related.get(post_id, ())]:
+            changed.append(post_id)
+    changed += [post_id for post_id, found in related.items() if found and post_id not in seen]
+    return changed
+
+
+def rebuild(k=RELATED_POSTS):
+    """
+    Recompute every post's related posts; returns the number stored. Posts
+    whose related posts changed are touched and their cached pages expired.
+    """
+    related = compute(k)
+    with transaction.atomic():
+        changed = changed_posts(related)
+        RelatedPost.objects.all().delete()
+        stored = store(
+            chain.from_iterable(
+                related_rows(post_id, ranked) for post_id, ranked in related.items()
+            )
+        )
+        for start in range(0, len(changed), BATCH_SIZE):
+            chunk = changed[start : start + BATCH_SIZE]
+            conditional.touch_posts(Post.objects.filter(pk__in=chunk))
+        pagecache.invalidate(*(pagecache.post_tag(post_id) for post_id in changed))
+    return stored
+
+
+def schedule_refresh(post_ids):
+    """
+    ``refresh_posts()`` once the current transaction commits, together with
+    every other post scheduled before then, e.g. by both halves of a
+    ``tags.set()``.
+    """
+    _pending.__dict__.setdefault("post_ids", set()).update(post_ids)
+    # The first callback refreshes everything pending; later ones find nothing
+    # left. Posts of a rolled back transaction go with the next commit.
+    transaction.on_commit(refresh_pending)
+
+
+def refresh_pending():
+    if post_ids := _pending.__dict__.pop("post_ids", None):
+        refresh_posts(post_ids)
+
+
+def refresh_posts(post_ids, k=RELATED_POSTS):
+    """Recompute the related posts of ``post_ids``, e.g. after they were retagged."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=post_ids).delete()
+        for start in range(0, len(post_ids), BATCH_SIZE):
+            found = neighbours(post_ids[start : start + BATCH_SIZE], k)
+            store(
+                chain.from_iterable(
+                    related_rows(post_id, ranked) for post_id, ranked in found.items()
+                )
+            )
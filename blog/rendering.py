@@ -0,0 +1,80 @@
+"""
+Fields derived from a post's ``content``: its word count, reading time and
+Markdown rendered to sanitized HTML.
+
+``Post.save()`` fills them whenever the content is saved, so pages only
+output ``content_html``. Posts written in bulk, which skips ``save()``, are
+rendered afterwards by ``backfill()`` (the ``render_posts`` command) in a
+pool of processes, since rendering is CPU-bound.
+
+The models import this module, not the other way round.
+"""
+
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import markdown
+import nh3
+from django.utils import timezone
+
+from . import pagecache
+
+WORDS_PER_MINUTE = 200
+WORD_RE = re.compile(r"\w+")
+MARKDOWN_EXTENSIONS = ["extra", "sane_lists"]
+RENDERED_FIELDS = ("word_count", "reading_time", "content_html")
+CHUNK_SIZE = 500
+
+
+def render_markdown(text):
+    """``text`` as HTML, with anything that could run script removed."""
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+    return nh3.clean(html, link_rel="noopener noreferrer nofollow")
+
+
+def rendered_fields(content):
+    """``{field: value}`` of the ``RENDERED_FIELDS`` for ``content``."""
+    content = content or ""
+    words = len(WORD_RE.findall(content))
+    return {
+        "word_count": words,
+        "reading_time": math.ceil(words / WORDS_PER_MINUTE),
+        "content_html": render_markdown(content) if content else "",
+    }
+
+
+def render_chunk(rows):
+    """``[(pk, fields)]`` for ``(pk, content)`` rows; runs in a worker process."""
+    return [(pk, rendered_fields(content)) for pk, content in rows]
+
+
+def backfill(posts, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Render the ``posts`` queryset in ``workers`` processes (one per CPU by
+    default) and write the results back with ``bulk_update`` a chunk at a
+    time, expiring their cached pages; returns the number of posts rendered.
+    """
+    model = posts.model
+    workers = workers or os.cpu_count() or 1
+    ids = list(posts.order_by("pk").values_list("pk", flat=True))
+    chunks = (ids[start : start + chunk_size] for start in range(0, len(ids), chunk_size))
+    rendered = 0
+    with ProcessPoolExecutor(workers) as pool:
+        # Read only a couple of chunks per worker ahead, to bound memory.
+        while batch := list(islice(chunks, workers * 2)):
+            rows = [
+                list(model.objects.filter(pk__in=chunk).values_list("pk", "content"))
+                for chunk in batch
+            ]
+            for results in pool.map(render_chunk, rows):
+                now = timezone.now()
+                model.objects.bulk_update(
+                    [model(pk=pk, updated_at=now, **fields) for pk, fields in results],
+                    [*RENDERED_FIELDS, "updated_at"],
+                )
+                pagecache.invalidate(*(pagecache.post_tag(pk) for pk, _ in results))
+                rendered += len(results)
+    return rendered
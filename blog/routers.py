@@ -0,0 +1,29 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the read-only ``replica`` connection and everything else
+    to the primary.
+
+    Both aliases open the same SQLite file, so the replica never lags: in WAL
+    mode its readers just don't wait for the primary's writers. Reads inside
+    a transaction on the primary stay there, to see its uncommitted writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,327 @@
+import re
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Case, Max, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post, SearchTerm
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TOKEN_LENGTH = 64
+# Highest code point, so ``token < prefix + MAX_CHAR`` bounds a prefix range
+# that SQLite can answer from the (token, post) index.
+MAX_CHAR = chr(0x10FFFF)
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+FIELD_WEIGHTS = {
+    "title": 8,
+    "tags": 4,
+    "category": 4,
+    "author": 4,
+    "excerpt": 2,
+    "content": 1,
+}
+
+INDEX_CHUNK_SIZE = 500
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if (len(token) > 1 or token.isdigit()) and token not in STOP_WORDS
+    ]
+
+
+def post_fields(post):
+    author = post.author
+    return {
+        "title": post.title,
+        "excerpt": post.excerpt or "",
+        "content": post.content or "",
+        "category": post.category.name if post.category else "",
+        "author": f"{author.first_name} {author.last_name} {author.username}",
+        "tags": " ".join(tag.name for tag in post.tags.all()),
+    }
+
+
+def chunked_posts(posts):
+    """Yield ``(ids, published_posts)`` for ``posts`` in index-sized chunks."""
+    posts = posts.select_related("author", "category").prefetch_related("tags")
+    ids = list(posts.values_list("pk", flat=True))
+    for start in range(0, len(ids), INDEX_CHUNK_SIZE):
+        chunk_ids = ids[start : start + INDEX_CHUNK_SIZE]
+        yield chunk_ids, posts.filter(pk__in=chunk_ids, published=True)
+
+
+class InvertedIndexBackend:
+    """Token -> post posting lists stored in the ``SearchTerm`` table."""
+
+    def post_terms(self, post):
+        weights = Counter()
+        for field, text in post_fields(post).items():
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+        return [
+            SearchTerm(token=token, post_id=post.pk, weight=weight)
+            for token, weight in weights.items()
+        ]
+
+    def index_posts(self, posts):
+        for chunk_ids, published in chunked_posts(posts):
+            terms = [term for post in published for term in self.post_terms(post)]
+            with transaction.atomic():
+                SearchTerm.objects.filter(post_id__in=chunk_ids).delete()
+                SearchTerm.objects.bulk_create(terms, batch_size=INDEX_CHUNK_SIZE)
+
+    def rebuild(self):
+        SearchTerm.objects.all().delete()
+        self.index_posts(Post.objects.filter(published=True))
+
+    def optimize(self):
+        pass
+
+    def remove_posts(self, pks):
+        SearchTerm.objects.filter(post_id__in=pks).delete()
+
+    def ranked(self, terms, posts=None):
+        clauses = [Q(token__gte=term, token__lt=term + MAX_CHAR) for term in terms]
+        matches = {
+            f"match_{i}": Max(Case(When(clause, then=Value(1)), default=Value(0)))
+            for i, clause in enumerate(clauses)
+        }
+        terms = SearchTerm.objects.filter(reduce(or_, clauses))
+        if posts is not None:
+            terms = terms.filter(post_id__in=posts.order_by().values("pk"))
+        return (
+            terms.values("post_id")
+            .annotate(score=Sum("weight"), **matches)
+            .filter(**{name: 1 for name in matches})
+        )
+
+    def matching(self, terms):
+        return self.ranked(terms).values("post_id")
+
+    def search(self, terms, page_number, per_page, posts=None):
+        ranked = self.ranked(terms, posts).order_by("-score", "-post_id")
+        page = Paginator(ranked, per_page).get_page(page_number)
+        page.object_list = [(row["post_id"], None) for row in page.object_list]
+        return page
+
+
+class FTSResults:
+    """Lazily counted and sliced FTS5 matches, so ``Paginator`` can page them."""
+
+    SNIPPET_START = "\x02"
+    SNIPPET_END = "\x03"
+
+    def __init__(self, backend, match, posts=None):
+        self.backend = backend
+        self.where = f"{backend.table} MATCH %s"
+        self.params = [match]
+        if posts is not None:
+            # Only posts in the ``posts`` queryset, e.g. narrowed by facets.
+            sql, params = posts.order_by().values("pk").query.sql_with_params()
+            self.where += f" AND rowid IN ({sql})"
+            self.params += params
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {self.backend.table} WHERE {self.where}",
+                self.params,
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, item):
+        table = self.backend.table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({table}, -1, %s, %s, '…', 16) "
+                f"FROM {table} WHERE {self.where} "
+                f"ORDER BY {self.backend.rank_expression} LIMIT %s OFFSET %s",
+                [
+                    self.SNIPPET_START,
+                    self.SNIPPET_END,
+                    *self.params,
+                    item.stop - item.start,
+                    item.start,
+                ],
+            )
+            return [(pk, self.highlight(snippet)) for pk, snippet in cursor.fetchall()]
+
+    def highlight(self, snippet):
+        return mark_safe(
+            escape(snippet)
+            .replace(self.SNIPPET_START, "<mark>")
+            .replace(self.SNIPPET_END, "</mark>")
+        )
+
+
+REBUILD_FTS_SQL = """
+INSERT INTO {table} (rowid, title, excerpt, content, tags, category, author)
+SELECT
+    p.id,
+    p.title,
+    COALESCE(p.excerpt, ''),
+    COALESCE(p.content, ''),
+    COALESCE(
+        (
+            SELECT group_concat(t.name, ' ')
+            FROM blog_post_tags pt JOIN blog_tag t ON t.id = pt.tag_id
+            WHERE pt.post_id = p.id
+        ),
+        ''
+    ),
+    COALESCE(c.name, ''),
+    u.first_name || ' ' || u.last_name || ' ' || u.username
+FROM blog_post p
+JOIN auth_user u ON u.id = p.author_id
+LEFT JOIN blog_category c ON c.id = p.category_id
+WHERE p.published
+"""
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 virtual table ranked by BM25 (see migration 0005)."""
+
+    table = "blog_post_fts"
+    columns = ("title", "excerpt", "content", "tags", "category", "author")
+
+    @cached_property
+    def rank_expression(self):
+        weights = ", ".join(str(float(FIELD_WEIGHTS[column])) for column in self.columns)
+        return f"bm25({self.table}, {weights})"
+
+    def insert(self, cursor, posts):
+        rows = []
+        for post in posts:
+            fields = post_fields(post)
+            rows.append([post.pk, *(fields[column] for column in self.columns)])
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(self.columns))})",
+            rows,
+        )
+
+    def index_posts(self, posts):
+        for chunk_ids, published in chunked_posts(posts):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN "
+                    f"({', '.join(['%s'] * len(chunk_ids))})",
+                    chunk_ids,
+                )
+                self.insert(cursor, published)
+
+    def rebuild(self):
+        # One INSERT ... SELECT so the whole corpus is copied inside SQLite.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(REBUILD_FTS_SQL.format(table=self.table))
+
+    def remove_posts(self, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"({', '.join(['%s'] * len(pks))})",
+                pks,
+            )
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+    def match(self, terms):
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def matching(self, terms):
+        return RawSQL(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [self.match(terms)]
+        )
+
+    def search(self, terms, page_number, per_page, posts=None):
+        results = FTSResults(self, self.match(terms), posts)
+        return Paginator(results, per_page).get_page(page_number)
+
+
+def get_backend():
+    backend = getattr(settings, "BLOG_SEARCH_BACKEND", None)
+    if backend is None:
+        backend = (
+            "blog.search.SQLiteFTSBackend"
+            if connection.vendor == "sqlite"
+            else "blog.search.InvertedIndexBackend"
+        )
+    return import_string(backend)()
+
+
+def index_posts(posts):
+    """(Re)index the given posts; unpublished posts are dropped from the index."""
+    get_backend().index_posts(posts)
+
+
+def index_post(post):
+    index_posts(Post.objects.filter(pk=post.pk))
+
+
+def remove_post(post):
+    get_backend().remove_posts([post.pk])
+
+
+def rebuild_index():
+    get_backend().rebuild()
+
+
+def optimize_index():
+    get_backend().optimize()
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def matching_posts(query):
+    """The published posts matching ``query``, as a queryset, e.g. to count facets."""
+    terms = query_terms(query)
+    if not terms:
+        return Post.objects.none()
+    return Post.objects.filter(published=True, pk__in=get_backend().matching(terms))
+
+
+def search(query, page_number=1, per_page=12, posts=None):
+    """
+    Return a page of published posts matching every word of ``query``.
+
+    Each query word is matched as a prefix and results come back in relevance
+    order. Backends may attach a highlighted ``search_snippet`` to each post.
+    Pass a ``posts`` queryset to only return matches among those posts.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return Paginator(Post.objects.none(), per_page).get_page(page_number)
+
+    page = get_backend().search(terms, page_number, per_page, posts)
+    snippets = dict(page.object_list)
+    posts = Post.objects.cards().in_bulk(snippets)
+    page.object_list = []
+    for pk, snippet in snippets.items():
+        if pk in posts:
+            posts[pk].search_snippet = snippet
+            page.object_list.append(posts[pk])
+    return page
@@ -0,0 +1,291 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import autocomplete, conditional, pagecache, related, search, stats
+from .models import AuthorProfile, Category, Post, Tag
+
+USER_SEARCH_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.post_saving(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_post_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.post_saved(instance, created)
+
+
+@receiver(post_save, sender=Post)
+def update_category_post_count(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.post_category_changed(instance, created)
+
+
+@receiver(pre_delete, sender=Post)
+def update_post_counts_on_delete(sender, instance, **kwargs):
+    # Tags are still linked at this point; they are gone by post_delete.
+    stats.post_removed_from_counts(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_stats(sender, instance, **kwargs):
+    stats.post_deleted(instance)
+
+
+@receiver(pre_delete, sender=Category)
+def touch_uncategorized_posts(sender, instance, **kwargs):
+    # Deleting the category nulls ``Post.category`` with a bulk update.
+    conditional.touch_posts(instance.posts.all())
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_stats(sender, instance, **kwargs):
+    stats.category_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_retagged_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            search.index_post(instance)
+            conditional.touch_posts(Post.objects.filter(pk=instance.pk))
+            related.schedule_refresh([instance.pk])
+        return
+
+    # ``instance`` is a Tag. ``pk_set`` is empty on clear, so remember the
+    # linked posts before they are unlinked.
+    if action == "pre_clear":
+        instance._cleared_post_ids = list(instance.posts.values_list("pk", flat=True))
+    elif action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_post_ids", [])
+    if action in ("post_add", "post_remove", "post_clear") and pk_set:
+        search.index_posts(Post.objects.filter(pk__in=pk_set))
+        conditional.touch_posts(Post.objects.filter(pk__in=pk_set))
+        related.schedule_refresh(pk_set)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_post_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    related = instance.posts if reverse else instance.tags
+    if action in ("pre_remove", "pre_clear"):
+        # ``remove()`` reports every pk it was given, linked or not.
+        linked = related.all() if action == "pre_clear" else related.filter(pk__in=pk_set)
+        instance._unlinked_pks = list(linked.values_list("pk", flat=True))
+        return
+
+    if action == "post_add":
+        pks, delta = pk_set, 1
+    elif action in ("post_remove", "post_clear"):
+        pks, delta = instance.__dict__.pop("_unlinked_pks", []), -1
+    else:
+        return
+    stats.post_tags_changed(instance, reverse, pks, delta)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_stats(sender, instance, **kwargs):
+    stats.tag_deleted(instance)
+
+
+@receiver(post_save, sender=Category)
+def index_category_posts(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search.index_posts(instance.posts.all())
+        conditional.touch_posts(instance.posts.all())
+
+
+@receiver(post_save, sender=Tag)
+def index_tag_posts(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search.index_posts(instance.posts.all())
+        conditional.touch_posts(instance.posts.all())
+
+
+@receiver(pre_delete, sender=Category)
+def reindex_posts_of_deleted_category(sender, instance, **kwargs):
+    # The posts are indexed under the category's name until it is gone.
+    post_ids = list(instance.posts.values_list("pk", flat=True))
+    if post_ids:
+        transaction.on_commit(
+            lambda: search.index_posts(Post.objects.filter(pk__in=post_ids))
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+def reindex_posts_of_deleted_tag(sender, instance, **kwargs):
+    # Deleting the tag unlinks its posts without an m2m_changed signal.
+    post_ids = list(instance.posts.values_list("pk", flat=True))
+    if not post_ids:
+        return
+    conditional.touch_posts(Post.objects.filter(pk__in=post_ids))
+
+    def reindex():
+        search.index_posts(Post.objects.filter(pk__in=post_ids))
+        related.refresh_posts(post_ids)
+
+    transaction.on_commit(reindex)
+
+
+@receiver(post_save, sender=User)
+def create_author_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def index_author_posts(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    # Logins save ``last_login`` only; don't reindex every post for that.
+    if update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_posts(instance.posts.all())
+    conditional.touch_posts(instance.posts.all())
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # ``saved_state`` still holds the values from before this save.
+    before = getattr(instance, "saved_state", {})
+    pagecache.invalidate(
+        pagecache.POSTS,
+        pagecache.post_tag(instance.pk),
+        *(
+            pagecache.category_tag(pk)
+            for pk in {before.get("category_id"), instance.category_id} - {None}
+        ),
+        *(
+            pagecache.author_tag(pk)
+            for pk in {before.get("author_id"), instance.author_id} - {None}
+        ),
+    )
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_pages(sender, instance, raw=False, **kwargs):
+    # Listings of all posts show category names too, and every page has them
+    # in the navbar.
+    if not raw:
+        pagecache.invalidate(
+            pagecache.POSTS, pagecache.NAV, pagecache.category_tag(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Post)
+def invalidate_nav_post_counts(sender, instance, created, raw=False, **kwargs):
+    # The navbar shows each category's published post count.
+    if raw:
+        return
+    before = instance.saved_state
+    if created or any(
+        before.get(field, getattr(instance, field)) != getattr(instance, field)
+        for field in ("category_id", "published")
+    ):
+        pagecache.invalidate(pagecache.NAV)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_nav_after_delete(sender, instance, **kwargs):
+    pagecache.invalidate(pagecache.NAV)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pagecache.invalidate(pagecache.tag_tag(instance.pk))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_retagged_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        pagecache.invalidate(pagecache.post_tag(instance.pk))
+        return
+    # Pages already showing the tag are tagged with it; newly tagged posts
+    # are not yet.
+    pagecache.invalidate(
+        pagecache.tag_tag(instance.pk),
+        *(pagecache.post_tag(pk) for pk in pk_set or ()),
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields):
+        return
+    categories = instance.posts.values_list("category_id", flat=True).distinct()
+    pagecache.invalidate(
+        pagecache.POSTS,
+        pagecache.author_tag(instance.pk),
+        *(pagecache.category_tag(pk) for pk in categories if pk is not None),
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_post_suggestions(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        autocomplete.post_changed(instance, created)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_suggestions(sender, instance, **kwargs):
+    autocomplete.post_deleted(instance)
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.category_changed(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    autocomplete.category_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=Tag)
+def update_tag_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.tag_changed(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_suggestions(sender, instance, **kwargs):
+    autocomplete.tag_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=User)
+def update_author_suggestions(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields):
+        return
+    autocomplete.author_changed(instance)
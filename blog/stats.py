@@ -0,0 +1,373 @@
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Substr
+
+from . import facets, pagecache
+from .models import Category, Post, SiteStatistic, Tag
+
+PUBLISHED_POSTS = "published_posts"
+ACTIVE_AUTHORS = "active_authors"
+TOTAL_VIEWS = "total_views"
+
+VERSION_KEY = "blog:stats_version"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def category_key(category_id):
+    return f"category:{category_id}"
+
+
+def author_key(author_id):
+    return f"author:{author_id}"
+
+
+def tag_key(tag_id):
+    return f"tag:{tag_id}"
+
+
+def length_key(reading_time):
+    return f"length:{facets.length_of(reading_time)}"
+
+
+def _cache_key(key):
+    version = cache.get_or_set(VERSION_KEY, 1, timeout=None)
+    return f"blog:stats:{version}:{key}"
+
+
+def _invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def get_value(key):
+    """Read a statistic, from the cache when possible."""
+    return cache.get_or_set(
+        _cache_key(key),
+        lambda: SiteStatistic.objects.filter(key=key)
+        .values_list("value", flat=True)
+        .first()
+        or 0,
+        timeout=CACHE_TIMEOUT,
+    )
+
+
+def get_site_stats():
+    return cache.get_or_set(
+        _cache_key("site"),
+        lambda: dict.fromkeys((PUBLISHED_POSTS, ACTIVE_AUTHORS, TOTAL_VIEWS), 0)
+        | dict(
+            SiteStatistic.objects.filter(
+                key__in=(PUBLISHED_POSTS, ACTIVE_AUTHORS, TOTAL_VIEWS)
+            ).values_list("key", "value")
+        ),
+        timeout=CACHE_TIMEOUT,
+    )
+
+
+def published_post_count():
+    return get_site_stats()[PUBLISHED_POSTS]
+
+
+def category_post_count(category_id):
+    return get_value(category_key(category_id))
+
+
+def author_post_count(author_id):
+    return get_value(author_key(author_id))
+
+
+def stored_value(prefix):
+    """The statistic ``<prefix><pk>`` of the outer row, 0 if there is none."""
+    # The key built in SQL, as ``category_key()`` and friends build it.
+    key = Concat(Value(prefix), Cast(OuterRef("pk"), CharField()))
+    stored = SiteStatistic.objects.filter(key=key).values("value")[:1]
+    return Coalesce(Subquery(stored), 0)
+
+
+def with_published_posts(categories):
+    """``categories`` annotated with their ``published_posts`` statistic."""
+    return categories.annotate(published_posts=stored_value("category:"))
+
+
+def published_facets():
+    """
+    Facet counts of every published post, as ``facets.Facets`` rows, read
+    from the per-category, author, tag and length statistics in one query.
+
+    Cached like the other statistics; labels can lag a rename for up to
+    ``BLOG_PAGE_CACHE_TIMEOUT`` seconds, as the facet counts of filtered
+    listings do.
+    """
+
+    # Only positive counts: a statistic that drifted below zero has nothing
+    # to filter by.
+
+    def counted(model, facet, prefix, label):
+        return (
+            model.objects.annotate(n=stored_value(prefix))
+            .filter(n__gt=0)
+            .order_by()
+            .values_list(Value(facet), Cast("pk", CharField()), label, "n")
+        )
+
+    def load():
+        lengths = SiteStatistic.objects.filter(
+            key__startswith="length:", value__gt=0
+        ).values_list(
+            Value(facets.LENGTH), Substr("key", len("length:") + 1), Value(""), "value"
+        )
+        return list(
+            counted(Category, facets.CATEGORY, "category:", "name").union(
+                counted(User, facets.AUTHOR, "author:", "username"),
+                counted(Tag, facets.TAG, "tag:", "name"),
+                lengths,
+                all=True,
+            )
+        )
+
+    return cache.get_or_set(
+        _cache_key("facets"), load, timeout=settings.BLOG_PAGE_CACHE_TIMEOUT
+    )
+
+
+# Async views read statistics with a single thread hop for the cache lookup
+# and its database fallback together.
+aget_site_stats = sync_to_async(get_site_stats)
+apublished_post_count = sync_to_async(published_post_count)
+acategory_post_count = sync_to_async(category_post_count)
+aauthor_post_count = sync_to_async(author_post_count)
+apublished_facets = sync_to_async(published_facets)
+
+
+def apply_deltas(deltas):
+    """
+    Apply per-key deltas in one transaction, with one UPDATE per distinct
+    delta rather than one per key.
+
+    ``author:<id>`` keys also maintain ``active_authors`` when an author's
+    published post count crosses zero. Scoped keys that drop to zero are
+    removed.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    keys_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        keys_by_delta[delta].append(key)
+    author_keys = [key for key in deltas if key.startswith("author:")]
+    scoped_keys = [key for key in deltas if ":" in key]
+
+    with transaction.atomic():
+        SiteStatistic.objects.bulk_create(
+            [SiteStatistic(key=key) for key in [*deltas, ACTIVE_AUTHORS]],
+            ignore_conflicts=True,
+        )
+        for delta, keys in keys_by_delta.items():
+            SiteStatistic.objects.filter(key__in=keys).update(value=F("value") + delta)
+
+        if author_keys:
+            values = dict(
+                SiteStatistic.objects.filter(key__in=author_keys).values_list(
+                    "key", "value"
+                )
+            )
+            became_active = sum(
+                1 for key in author_keys if deltas[key] > 0 and values[key] == deltas[key]
+            )
+            became_inactive = sum(
+                1 for key in author_keys if deltas[key] < 0 and values[key] == 0
+            )
+            if became_active != became_inactive:
+                SiteStatistic.objects.filter(key=ACTIVE_AUTHORS).update(
+                    value=F("value") + became_active - became_inactive
+                )
+
+        if scoped_keys:
+            SiteStatistic.objects.filter(key__in=scoped_keys, value=0).delete()
+        transaction.on_commit(_invalidate)
+
+
+def post_deltas(state, sign):
+    """Deltas contributed by a post in ``state``, added (1) or removed (-1)."""
+    deltas = Counter({TOTAL_VIEWS: sign * (state.get("views") or 0)})
+    if state.get("published"):
+        deltas[PUBLISHED_POSTS] += sign
+        deltas[author_key(state["author_id"])] += sign
+        deltas[length_key(state["reading_time"])] += sign
+        if state.get("category_id") is not None:
+            deltas[category_key(state["category_id"])] += sign
+        for tag_id in state.get("tag_ids", ()):
+            deltas[tag_key(tag_id)] += sign
+    return deltas
+
+
+def post_saving(post):
+    """Remember the stored state of a post that was not loaded from the DB."""
+    if getattr(post, "saved_state", None) is None:
+        stored = None
+        if post.pk is not None:
+            stored = Post.objects.filter(pk=post.pk).values(*Post.TRACKED_FIELDS).first()
+        post.saved_state = stored or {}
+
+
+def post_saved(post, created):
+    current = post.current_state()
+    previous = {} if created else post.saved_state
+    if previous:
+        # Deferred fields were not loaded, so they cannot have changed.
+        previous = {**current, **previous}
+
+    if previous and previous["published"] != current["published"]:
+        # Tags only count published posts. A new post has no tags yet.
+        tag_ids = list(post.tags.values_list("pk", flat=True))
+        current["tag_ids"] = previous["tag_ids"] = tag_ids
+
+    deltas = post_deltas(current, 1)
+    deltas.update(post_deltas(previous, -1))
+    apply_deltas(deltas)
+
+
+def post_deleted(post):
+    state = {**post.current_state(), **getattr(post, "saved_state", {})}
+    # Remembered by ``post_removed_from_counts()``, while still linked.
+    state["tag_ids"] = getattr(post, "deleted_tag_ids", [])
+    apply_deltas(post_deltas(state, -1))
+
+
+def post_tags_changed(instance, reverse, pks, delta):
+    """
+    Count ``pks`` tags linked to (``delta`` 1) or unlinked from a post, or
+    posts to or from a tag if ``reverse``.
+    """
+    if reverse:
+        adjust_post_count(Tag, [instance.pk], delta * len(pks))
+        published = Post.objects.filter(pk__in=pks, published=True).count()
+        apply_deltas({tag_key(instance.pk): delta * published})
+    else:
+        adjust_post_count(Tag, pks, delta)
+        if instance.published:
+            apply_deltas({tag_key(pk): delta for pk in pks})
+
+
+def category_deleted(category):
+    SiteStatistic.objects.filter(key=category_key(category.pk)).delete()
+    transaction.on_commit(_invalidate)
+
+
+def tag_deleted(tag):
+    SiteStatistic.objects.filter(key=tag_key(tag.pk)).delete()
+    transaction.on_commit(_invalidate)
+
+
+def views_flushed(views):
+    apply_deltas({TOTAL_VIEWS: views})
+
+
+def compute_stats():
+    """Recompute every statistic from the Post table."""
+    published = Post.objects.filter(published=True)
+    values = {
+        PUBLISHED_POSTS: published.count(),
+        TOTAL_VIEWS: Post.objects.aggregate(total=Sum("views"))["total"] or 0,
+    }
+    authors = dict(
+        published.order_by().values_list("author_id").annotate(n=Count("id"))
+    )
+    values[ACTIVE_AUTHORS] = len(authors)
+    values.update((author_key(author_id), n) for author_id, n in authors.items())
+    categories = (
+        published.filter(category__isnull=False)
+        .order_by()
+        .values_list("category_id")
+        .annotate(n=Count("id"))
+    )
+    values.update((category_key(category_id), n) for category_id, n in categories)
+    tags = (
+        Post.tags.through.objects.filter(post__published=True)
+        .order_by()
+        .values_list("tag_id")
+        .annotate(n=Count("id"))
+    )
+    values.update((tag_key(tag_id), n) for tag_id, n in tags)
+    lengths = published.aggregate(
+        **{
+            f"length:{value}": Count("id", filter=Q(**facets.length_range(value)))
+            for value, *_ in facets.LENGTHS
+        }
+    )
+    values.update((key, n) for key, n in lengths.items() if n)
+    return values
+
+
+def reconcile():
+    values = compute_stats()
+    with transaction.atomic():
+        SiteStatistic.objects.all().delete()
+        SiteStatistic.objects.bulk_create(
+            SiteStatistic(key=key, value=value) for key, value in values.items()
+        )
+        recount_post_counts()
+        transaction.on_commit(_invalidate)
+        # The navbar shows the per-category counts.
+        pagecache.invalidate(pagecache.NAV)
+    return values
+
+
+# Denormalized ``post_count`` columns on Category and Tag count every post,
+# published or not, and are adjusted in place with ``F()`` updates.
+
+
+def adjust_post_count(model, pks, delta):
+    pks = [pk for pk in pks if pk is not None]
+    if pks and delta:
+        model.objects.filter(pk__in=pks).update(post_count=F("post_count") + delta)
+
+
+def post_category_changed(post, created):
+    previous = None if created else post.saved_state.get("category_id", post.category_id)
+    if previous != post.category_id:
+        adjust_post_count(Category, [previous], -1)
+        adjust_post_count(Category, [post.category_id], 1)
+
+
+def post_removed_from_counts(post):
+    category_id = getattr(post, "saved_state", {}).get("category_id", post.category_id)
+    adjust_post_count(Category, [category_id], -1)
+    post.deleted_tag_ids = list(post.tags.values_list("pk", flat=True))
+    adjust_post_count(Tag, post.deleted_tag_ids, -1)
+
+
+def recount_post_counts():
+    Category.objects.update(
+        post_count=Coalesce(
+            Subquery(
+                Post.objects.filter(category=OuterRef("pk"))
+                .order_by()
+                .values("category")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        )
+    )
+    Tag.objects.update(
+        post_count=Coalesce(
+            Subquery(
+                Post.tags.through.objects.filter(tag=OuterRef("pk"))
+                .order_by()
+                .values("tag")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        )
+    )
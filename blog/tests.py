@@ -1,3 +1,994 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    autocomplete,
+    context_processors,
+    export,
+    facets,
+    metrics,
+    pagecache,
+    related,
+    rendering,
+    search,
+    stats,
+    trending,
+    views,
+)
+from .counters import view_counter
+from .models import Category, Post, PostViewBucket, SiteStatistic, Tag
+from .pagination import NEXT, PREVIOUS, KeysetPaginator, decode_cursor, encode_cursor
+from .querybudget import (
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    assert_query_budget,
+    query_budget,
+)
+from .routers import ReadReplicaRouter
+
+
+class BlogTestMixin:
+    def setUp(self):
+        # Stats and counts are cached; the DB is rolled back between tests.
+        cache.clear()
+        self.addCleanup(view_counter.flush)
+
+    def make_posts(self, count, start=0, **fields):
+        posts = []
+        for i in range(start, start + count):
+            author = User.objects.create_user(
+                f"writer{i}", first_name="Writer", last_name=str(i)
+            )
+            category, _ = Category.objects.get_or_create(name=f"Category {i % 3}")
+            tag, _ = Tag.objects.get_or_create(name=f"Tag {i % 4}")
+            post = Post.objects.create(
+                title=f"Django post {i}",
+                author=author,
+                category=category,
+                excerpt=f"Excerpt {i}",
+                content="Content",
+                **{"published": True, "is_featured": True, **fields},
+            )
+            post.tags.add(tag)
+            posts.append(post)
+        return posts
+
+
+@override_settings(BLOG_VIEW_COUNTER_FLUSH_INTERVAL=0, BLOG_PAGE_CACHE_ENABLED=False)
+class BlogTestCase(BlogTestMixin, TestCase):
+    pass
+
+
+@override_settings(BLOG_VIEW_COUNTER_FLUSH_INTERVAL=0, BLOG_PAGE_CACHE_ENABLED=False)
+class BlogTransactionTestCase(BlogTestMixin, TransactionTestCase):
+    """Commits for real, so ``atomic()`` blocks begin transactions as in production."""
+
+    def tearDown(self):
+        # The flush between tests skips the search index's virtual table.
+        Post.objects.all().delete()
+
+
+class QueryBudgetTests(BlogTestCase):
+    def test_assert_query_budget_fails_over_budget(self):
+        with self.assertRaisesMessage(AssertionError, "exceed the budget of 1"):
+            with assert_query_budget(1):
+                list(Post.objects.all())
+                list(Tag.objects.all())
+
+    def test_repeated_query_shapes_are_reported_as_n_plus_one(self):
+        self.make_posts(3)
+        with self.assertRaisesMessage(AssertionError, "N+1: 3 x"):
+            with assert_query_budget(repeat_threshold=3):
+                [post.author.username for post in Post.objects.all()]
+
+    @override_settings(BLOG_QUERY_BUDGET_ENABLED=True, BLOG_QUERY_BUDGET_RAISE=True)
+    def test_middleware_enforces_declared_budget(self):
+        @query_budget(1)
+        def view(request):
+            list(Post.objects.all())
+            list(Tag.objects.all())
+
+        request = RequestFactory().get("/")
+        middleware = QueryBudgetMiddleware(lambda request: view(request))
+        middleware.process_view(request, view, (), {})
+        with self.assertRaises(QueryBudgetExceeded):
+            middleware(request)
+
+
+@override_settings(BLOG_QUERY_BUDGET_ENABLED=True, BLOG_QUERY_BUDGET_RAISE=True)
+class ViewQueryBudgetTests(BlogTestCase):
+    def urls(self):
+        post = Post.objects.earliest("id")
+        return [
+            reverse("blog:home"),
+            reverse("blog:about"),
+            reverse("blog:contact"),
+            reverse("blog:posts"),
+            reverse("blog:post_detail", args=[post.pk]),
+            reverse("blog:category_posts", args=[post.category.slug]),
+            reverse("blog:author_posts", args=[post.author.profile.slug]),
+            reverse("blog:search_posts") + "?q=django",
+            reverse("blog:post_create"),
+            reverse("blog:post_update", args=[post.pk]),
+            reverse("blog:post_delete", args=[post.pk]),
+        ]
+
+    def test_views_stay_within_budget_as_data_grows(self):
+        for total in (3, 30):
+            self.make_posts(total - Post.objects.count(), start=Post.objects.count())
+            for url in self.urls():
+                with self.subTest(posts=total, url=url):
+                    cache.clear()
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(BLOG_PAGE_CACHE_ENABLED=True)
+    def test_reads_stay_within_budget_with_the_page_cache_on(self):
+        self.make_posts(3)
+        reader = self.client_class()
+        reader.force_login(User.objects.create_user("reader"))
+        for client in (self.client, reader):
+            for url in self.urls():
+                with self.subTest(logged_in=client is reader, url=url):
+                    self.assertEqual(client.get(url).status_code, 200)
+
+
+@override_settings(BLOG_QUERY_BUDGET_ENABLED=True, BLOG_QUERY_BUDGET_RAISE=True)
+class WriteViewQueryBudgetTests(BlogTransactionTestCase):
+    def post_data(self, post, **fields):
+        return {
+            "title": post.title,
+            "excerpt": "Excerpt",
+            "content": "Content",
+            "category": post.category_id,
+            "author": post.author_id,
+            "published": "on",
+            **fields,
+        }
+
+    def test_write_views_stay_within_budget(self):
+        post, other = self.make_posts(2)
+        data = self.post_data(post, title="Updated")
+        response = self.client.post(reverse("blog:post_create"), {**data, "title": "New"})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse("blog:post_update", args=[post.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse("blog:post_delete", args=[other.pk]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_worst_case_writes_stay_within_budget(self):
+        posts = self.make_posts(6)
+        post, retagged, newcomer = posts[0], posts[1], posts[5]
+        retagged.tags.add(*Tag.objects.all())
+        trending.record_views({retagged.pk: 3})
+        trending.rebuild()
+        related.rebuild()
+        autocomplete.index.load()
+        newcomer.delete()
+        edits = [
+            # Unpublished, moved to another category and author.
+            {"category": posts[2].category_id, "author": posts[1].author_id, "published": ""},
+            # Published again, by an author with no other published post.
+            {"category": posts[1].category_id, "author": newcomer.author_id},
+        ]
+        for fields in edits:
+            with self.subTest(**fields):
+                url = reverse("blog:post_update", args=[post.pk])
+                response = self.client.post(url, self.post_data(post, **fields))
+                self.assertEqual(response.status_code, 302)
+        # The first published post of a new author.
+        author = User.objects.create_user("first-timer")
+        data = self.post_data(post, title="New", author=author.pk)
+        response = self.client.post(reverse("blog:post_create"), data)
+        self.assertEqual(response.status_code, 302)
+        # Every tag, related and trending rows, and the author's last post.
+        for deleted in (retagged, post):
+            with self.subTest(deleted=deleted.title):
+                response = self.client.post(reverse("blog:post_delete", args=[deleted.pk]))
+                self.assertEqual(response.status_code, 302)
+
+
+@override_settings(BLOG_QUERY_BUDGET_ENABLED=True, BLOG_QUERY_BUDGET_RAISE=True)
+class AsyncViewTests(BlogTestCase):
+    async def test_read_views_run_under_asgi(self):
+        post, _ = await sync_to_async(self.make_posts)(2)
+        urls = [
+            reverse("blog:home"),
+            reverse("blog:posts"),
+            reverse("blog:post_detail", args=[post.pk]),
+            reverse("blog:category_posts", args=["category-0"]),
+            reverse("blog:author_posts", args=["writer-0"]),
+            reverse("blog:search_posts") + "?q=django",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.get(reverse("blog:home"))
+        self.assertEqual(response.context["total_posts"], 2)
+        self.assertEqual(len(response.context["featured_posts"]), 2)
+
+        # Queries made by async views are still counted against the budget.
+        with mock.patch.object(views.posts, "query_budget", 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.async_client.get(reverse("blog:posts"))
+
+
+class SearchTests(BlogTestCase):
+    def test_matches_every_word_as_prefix(self):
+        _, second = self.make_posts(2)
+        titles = [post.title for post in search.search("djan post 1").object_list]
+        self.assertEqual(titles, [second.title])
+
+    def test_index_follows_publishing_and_deletes(self):
+        (post,) = self.make_posts(1)
+        post.published = False
+        post.save()
+        self.assertEqual(search.search("django").paginator.count, 0)
+        post.published = True
+        post.save()
+        self.assertEqual(search.search("django").paginator.count, 1)
+        post.delete()
+        self.assertEqual(search.search("django").paginator.count, 0)
+
+    def test_index_follows_deleted_categories_and_tags(self):
+        first, second, _ = self.make_posts(3)
+        first.category = Category.objects.create(name="Zephyr")
+        first.save()
+        tag = Tag.objects.create(name="Quasar")
+        tag.posts.add(first, second)
+        related.rebuild()
+        self.assertEqual(search.search("zephyr").paginator.count, 1)
+        self.assertEqual(search.search("quasar").paginator.count, 2)
+        self.assertEqual(list(related.related_posts(first.pk)), [second])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.category.delete()
+            tag.delete()
+        self.assertEqual(search.search("zephyr").paginator.count, 0)
+        self.assertEqual(search.search("quasar").paginator.count, 0)
+        self.assertEqual(list(related.related_posts(first.pk)), [])
+
+    @override_settings(BLOG_SEARCH_BACKEND="blog.search.InvertedIndexBackend")
+    def test_inverted_index_backend(self):
+        self.make_posts(3)
+        search.rebuild_index()
+        self.assertEqual(search.search("tag").paginator.count, 3)
+        self.assertEqual(search.search("writer 2").paginator.count, 1)
+
+
+class FacetTests(BlogTestCase):
+    def counts(self, response, facet):
+        return {item["label"]: item["count"] for item in response.context["facets"].values[facet]}
+
+    def test_posts_narrow_by_facets_with_counts_in_one_query(self):
+        posts = self.make_posts(6)
+        Post.objects.filter(pk__in=[posts[0].pk, posts[1].pk]).update(reading_time=12)
+        # Bulk updates bypass the statistics.
+        stats.reconcile()
+        response = self.client.get(reverse("blog:posts"))
+        self.assertEqual(
+            self.counts(response, facets.TAG), {"Tag 0": 2, "Tag 1": 2, "Tag 2": 1, "Tag 3": 1}
+        )
+        self.assertEqual(
+            self.counts(response, facets.LENGTH), {"Under 5 min": 4, "Over 10 min": 2}
+        )
+
+        params = QueryDict(f"category={posts[0].category_id}&length=long")
+        filters = facets.parse_filters(params)
+        with self.assertNumQueries(1):
+            result = facets.facets(
+                facets.filter_posts(Post.objects.filter(published=True), filters), params
+            )
+        self.assertEqual(result.total, 1)
+        # Later pages of the same listing reuse the counts.
+        with self.assertNumQueries(0):
+            facets.facets(facets.filter_posts(Post.objects.filter(published=True), filters), params)
+        response = self.client.get(reverse("blog:posts"), params)
+        self.assertEqual(list(response.context["posts"]), [posts[0]])
+        self.assertEqual(response.context["total_posts"], 1)
+        (category,) = response.context["facets"].values[facets.CATEGORY]
+        self.assertTrue(category["selected"])
+        self.assertEqual(category["url"], "?length=long")
+
+    def test_unfiltered_listing_counts_facets_from_the_statistics(self):
+        posts = self.make_posts(4)
+        posts[0].tags.add(Tag.objects.get(name="Tag 1"))
+        posts[1].published = False
+        posts[1].save()
+        expected = facets.facets(Post.objects.filter(published=True), QueryDict())
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("blog:posts"))
+        self.assertEqual(response.context["facets"].values, expected.values)
+        self.assertEqual(response.context["total_posts"], 3)
+        self.assertFalse(any("WITH results" in query["sql"] for query in queries))
+
+    def test_search_results_narrow_by_facets(self):
+        posts = self.make_posts(6)
+        for backend in ("blog.search.SQLiteFTSBackend", "blog.search.InvertedIndexBackend"):
+            with self.subTest(backend=backend), self.settings(BLOG_SEARCH_BACKEND=backend):
+                search.rebuild_index()
+                response = self.client.get(
+                    reverse("blog:search_posts"), {"q": "django", "tag": posts[1].tags.get().pk}
+                )
+                self.assertEqual(
+                    sorted(post.pk for post in response.context["posts"]),
+                    [posts[1].pk, posts[5].pk],
+                )
+                self.assertEqual(self.counts(response, facets.AUTHOR), {"writer1": 1, "writer5": 1})
+
+
+class KeysetPaginationTests(BlogTestCase):
+    def test_cursors_walk_every_post_once(self):
+        self.make_posts(30)
+        seen, cursor = [], ""
+        while True:
+            response = self.client.get(reverse("blog:posts"), {"cursor": cursor})
+            page = response.context["page_obj"]
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sorted(seen), sorted(Post.objects.values_list("pk", flat=True)))
+        self.assertEqual(response.context["total_posts"], 30)
+
+        response = self.client.get(reverse("blog:posts"), {"cursor": page.previous_cursor})
+        self.assertEqual(len(response.context["page_obj"]), 12)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+class QueryPlanTests(BlogTestCase):
+    def hot_queries(self):
+        """``{name: (queryset, index it must read)}``."""
+        post = Post.objects.filter(published=True).earliest("id")
+        published = Post.objects.filter(published=True).select_related("author", "category")
+        listings = {
+            "posts": (published, "post_published_idx"),
+            "category_posts": (
+                published.filter(category_id=post.category_id),
+                "post_category_published_idx",
+            ),
+            "author_posts": (
+                published.filter(author_id=post.author_id),
+                "post_author_published_idx",
+            ),
+        }
+        queries = {
+            "home featured": (
+                Post.objects.filter(is_featured=True).select_related("author", "category"),
+                "post_featured_idx",
+            ),
+            "published count": (
+                Post.objects.filter(published=True).order_by(),
+                "post_published_idx",
+            ),
+            "author counts": (
+                Post.objects.filter(published=True)
+                .order_by()
+                .values_list("author_id")
+                .annotate(n=Count("id")),
+                "post_author_published_idx",
+            ),
+            "admin changelist": (
+                Post.objects.select_related("author", "category"),
+                "post_created_idx",
+            ),
+        }
+        for name, (queryset, index) in listings.items():
+            paginator = KeysetPaginator(queryset, 12)
+            for cursor in (None, encode_cursor(NEXT, post), encode_cursor(PREVIOUS, post)):
+                direction = "first" if cursor is None else decode_cursor(cursor)[0]
+                queries[f"{name} {direction}"] = (paginator.query(cursor)[0], index)
+        return queries
+
+    def test_hot_queries_read_their_index(self):
+        self.make_posts(30)
+        Post.objects.filter(pk__in=Post.objects.all()[:10]).update(published=False)
+        for name, (queryset, index) in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                # Neither a table scan nor a sort of the matching rows.
+                self.assertRegex(plan, rf"blog_post USING (COVERING )?INDEX {index}\b")
+                self.assertNotIn("USE TEMP B-TREE", plan)
+
+
+class CardProjectionTests(BlogTestCase):
+    def test_cards_leave_the_body_behind(self):
+        self.make_posts(2)
+        with self.assertNumQueries(1):
+            cards = list(Post.objects.cards())
+            for post in cards:
+                shown = [post.title, post.excerpt, post.reading_time, str(post.author)]
+                self.assertNotIn(None, [*shown, post.category.name, post.category.icon])
+        self.assertIn("content", cards[0].get_deferred_fields())
+
+
+class RenderingTests(BlogTestCase):
+    def test_saving_renders_content_and_reading_time(self):
+        post = self.make_posts(1)[0]
+        post.content = "# Title\n\n" + "word " * 401 + "[link](https://example.com)"
+        post.save(update_fields=["content"])
+        post.refresh_from_db()
+        self.assertEqual((post.word_count, post.reading_time), (406, 3))
+        self.assertIn("<h1>Title</h1>", post.content_html)
+        self.assertIn('rel="noopener noreferrer nofollow"', post.content_html)
+        response = self.client.get(reverse("blog:post_detail", args=[post.pk]))
+        self.assertContains(response, "<h1>Title</h1>", html=True)
+
+    def test_script_is_stripped(self):
+        html = rendering.render_markdown(
+            "<script>alert(1)</script> [x](javascript:alert(1)) <b onclick='x()'>b</b>"
+        )
+        self.assertNotIn("script", html)
+        self.assertNotIn("javascript", html)
+        self.assertNotIn("onclick", html)
+
+    @override_settings(BLOG_PAGE_CACHE_ENABLED=True)
+    def test_render_posts_backfills_in_parallel(self):
+        posts = self.make_posts(5)
+        content = "Some *emphasis* " + "word " * 1200
+        Post.objects.update(content=content, content_html="", word_count=0, reading_time=0)
+        urls = [reverse("blog:posts"), reverse("blog:post_detail", args=[posts[0].pk])]
+        for url in urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("render_posts", workers=2, chunk_size=2, stdout=io.StringIO())
+        self.assertFalse(Post.objects.unrendered().exists())
+        self.assertEqual(
+            set(Post.objects.values_list("word_count", "reading_time")), {(1202, 7)}
+        )
+        self.assertIn("<em>emphasis</em>", Post.objects.first().content_html)
+        self.assertEqual(
+            dict(SiteStatistic.objects.values_list("key", "value")), stats.compute_stats()
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)["X-Page-Cache"], "MISS")
+
+
+class RelatedPostsTests(BlogTestCase):
+    def related_ids(self, post):
+        return list(related.related_posts(post.pk).values_list("pk", flat=True))
+
+    def test_related_posts_share_tags_and_follow_retagging(self):
+        posts = self.make_posts(8)
+        related.rebuild()
+        # Posts i and i + 4 share "Tag {i % 4}".
+        self.assertEqual(self.related_ids(posts[0]), [posts[4].pk])
+        response = self.client.get(reverse("blog:post_detail", args=[posts[0].pk]))
+        self.assertContains(response, posts[4].title)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            posts[0].tags.add(Tag.objects.get(name="Tag 1"))
+        # Half the tags in common with each; newer posts first.
+        expected = [posts[5].pk, posts[4].pk, posts[1].pk]
+        self.assertEqual(self.related_ids(posts[0]), expected)
+        # The batch job agrees with the incremental refresh.
+        self.assertEqual([pk for pk, _ in related.compute()[posts[0].pk]], expected)
+
+    def test_retagged_posts_are_refreshed_together_on_commit(self):
+        posts = self.make_posts(8)
+        # The test's transaction never commits, so run what make_posts() left.
+        related.refresh_pending()
+        tag = Tag.objects.create(name="New")
+        with mock.patch.object(related, "refresh_posts", wraps=related.refresh_posts) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.posts.add(*posts[1:4])
+                posts[4].tags.set([tag])
+                posts[5].tags.add(tag)
+                refresh.assert_not_called()
+        refresh.assert_called_once()
+        self.assertEqual(set(refresh.call_args.args[0]), {post.pk for post in posts[1:6]})
+
+        # Posts 1 and 5 have the same tags.
+        with CaptureQueriesContext(connection) as one:
+            related.refresh_posts([posts[1].pk])
+        with CaptureQueriesContext(connection) as many:
+            related.refresh_posts([posts[1].pk, posts[5].pk])
+        self.assertEqual(len(many), len(one))
+        computed = related.compute()
+        for post in posts[1:6]:
+            expected = [pk for pk, _ in computed.get(post.pk, [])]
+            self.assertEqual(self.related_ids(post), expected)
+
+    def test_refresh_ranks_against_the_newest_posts_of_each_tag(self):
+        posts = self.make_posts(8)
+        # Posts 0 and 4 share "Tag 0"; post 4 is its newest post.
+        self.assertEqual(related.neighbours([posts[4].pk])[posts[4].pk], [(posts[0].pk, 1.0)])
+        self.assertEqual(related.neighbours([posts[4].pk], candidates=1), {posts[4].pk: []})
+
+    @override_settings(BLOG_PAGE_CACHE_ENABLED=True)
+    def test_rebuild_expires_pages_whose_related_posts_changed(self):
+        posts = self.make_posts(8)
+        related.rebuild()
+        urls = [reverse("blog:post_detail", args=[post.pk]) for post in posts[:3]]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+
+        # Retagged behind the signals' back, as a bulk import would.
+        Post.tags.through.objects.create(post=posts[0], tag=Tag.objects.get(name="Tag 1"))
+        with self.captureOnCommitCallbacks(execute=True):
+            related.rebuild()
+        responses = [self.client.get(url) for url in urls]
+        # Post 0 now shares a tag with post 1, whose page lists it; post 2's
+        # related posts are unchanged.
+        self.assertEqual([r["X-Page-Cache"] for r in responses], ["MISS", "MISS", "HIT"])
+        self.assertNotEqual(responses[0]["ETag"], etags[0])
+        self.assertEqual(responses[2]["ETag"], etags[2])
+
+
+class AutocompleteTests(BlogTestCase):
+    def labels(self, prefix):
+        response = self.client.get(reverse("blog:search_autocomplete"), {"q": prefix})
+        return [suggestion["label"] for suggestion in response.json()["suggestions"]]
+
+    def test_suggestions_complete_any_word_and_follow_changes(self):
+        posts = self.make_posts(3)
+        self.assertEqual(self.labels("djan"), ["Django post 0", "Django post 1", "Django post 2"])
+        self.assertEqual(self.labels("category 1"), ["Category 1"])
+        self.assertEqual(self.labels("post 2"), ["Django post 2"])
+        self.assertEqual(self.labels("writer 0"), ["Writer 0"])
+        self.assertEqual(self.labels("nothing"), [])
+
+        version = autocomplete.index.version
+        with self.captureOnCommitCallbacks(execute=True):
+            posts[0].title = "Flask tips"
+            posts[0].save()
+            posts[1].delete()
+            Tag.objects.create(name="Flask")
+        # Applied in place rather than reloaded, one version per change.
+        self.assertEqual(autocomplete.index.version, version + 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels("fla"), ["Flask", "Flask tips"])
+            self.assertEqual(self.labels("djan"), ["Django post 2"])
+            self.assertEqual(self.labels("tips"), ["Flask tips"])
+
+        # Another process's change reloads the index.
+        cache.incr(autocomplete.VERSION_KEY)
+        Post.objects.filter(pk=posts[2].pk).update(title="Renamed elsewhere")
+        self.assertEqual(self.labels("renamed"), ["Renamed elsewhere"])
+        self.assertGreater(autocomplete.index.stats()["bytes"], 0)
+
+
+class TrendingTests(BlogTestCase):
+    def test_recent_views_rank_higher_and_show_on_pages(self):
+        posts = self.make_posts(4)
+        url = reverse("blog:post_detail", args=[posts[1].pk])
+        for _ in range(3):
+            self.client.get(url)
+        view_counter.flush()
+        trending.record_views({posts[3].pk: 2})
+        # Two half-lives ago: worth a quarter.
+        trending.record_views({posts[0].pk: 5}, now=timezone.now() - timedelta(hours=12))
+        # A post deleted before its views were flushed is skipped.
+        trending.record_views({posts[2].pk + 100: 1})
+        self.assertEqual(
+            PostViewBucket.objects.get(post=posts[1], hour=trending.current_hour()).views, 3
+        )
+
+        call_command("compute_trending", stdout=io.StringIO())
+        response = self.client.get(reverse("blog:home"))
+        self.assertEqual(
+            list(response.context["trending_posts"]), [posts[1], posts[3], posts[0]]
+        )
+        self.assertContains(response, "Trending")
+        response = self.client.get(reverse("blog:category_posts", args=["category-0"]))
+        self.assertEqual(list(response.context["trending_posts"]), [posts[3], posts[0]])
+
+        # Views that left the window are dropped.
+        trending.rebuild(window_hours=6)
+        self.assertEqual(
+            list(trending.trending_posts().values_list("pk", flat=True)),
+            [posts[1].pk, posts[3].pk],
+        )
+        self.assertFalse(PostViewBucket.objects.filter(post=posts[0]).exists())
+
+
+class SlugRouteTests(BlogTestCase):
+    def test_category_and_author_pages_resolve_by_slug(self):
+        (post,) = self.make_posts(1)
+        self.assertEqual(post.category.slug, "category-0")
+        self.assertEqual(post.author.profile.slug, "writer-0")
+
+        response = self.client.get(reverse("blog:category_posts", args=["category-0"]))
+        self.assertEqual(list(response.context["posts"]), [post])
+        response = self.client.get(reverse("blog:author_posts", args=["writer-0"]))
+        self.assertEqual(list(response.context["posts"]), [post])
+        response = self.client.get(reverse("blog:category_posts", args=["missing"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ViewCounterTests(BlogTestCase):
+    def test_views_are_buffered_then_flushed(self):
+        (post,) = self.make_posts(1)
+        url = reverse("blog:post_detail", args=[post.pk])
+        self.client.get(url)
+        response = self.client.get(url)
+
+        self.assertEqual(response.context["post"].views, 2)
+        self.assertEqual(Post.objects.get(pk=post.pk).views, 0)
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(Post.objects.get(pk=post.pk).views, 2)
+        self.assertEqual(stats.get_site_stats()[stats.TOTAL_VIEWS], 2)
+
+
+class ConditionalGetTests(BlogTestCase):
+    def test_post_page_revalidates_and_still_counts_the_view(self):
+        (post,) = self.make_posts(1)
+        url = reverse("blog:post_detail", args=[post.pk])
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view_counter.pending(post.pk), 2)
+
+        post.tags.add(Tag.objects.create(name="New tag"))
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_listings_change_when_posts_change(self):
+        first, _ = self.make_posts(2)
+        urls = [
+            reverse("blog:posts"),
+            reverse("blog:category_posts", args=[first.category.slug]),
+            reverse("blog:author_posts", args=[first.author.profile.slug]),
+        ]
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        for url, etag in etags.items():
+            response = self.client.get(url, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 304)
+
+        first.category.name = "Renamed"
+        first.category.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, headers={"if-none-match": etag})
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(BLOG_PAGE_CACHE_ENABLED=True)
+class PageCacheTests(BlogTestCase):
+    def cache_state(self, url):
+        return self.client.get(url).get("X-Page-Cache")
+
+    def test_pages_are_cached_until_something_they_show_changes(self):
+        post, other = self.make_posts(2)
+        detail = reverse("blog:post_detail", args=[post.pk])
+        category = reverse("blog:category_posts", args=[other.category.slug])
+        self.assertEqual(self.cache_state(detail), "MISS")
+        self.assertEqual(self.cache_state(category), "MISS")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache_state(detail), "HIT")
+        self.assertEqual(view_counter.pending(post.pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = post.tags.get()
+            tag.name = "Renamed"
+            tag.save()
+        self.assertEqual(self.cache_state(detail), "MISS")
+        self.assertEqual(self.cache_state(category), "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.title = "Retitled"
+            other.save()
+        self.assertEqual(self.cache_state(category), "MISS")
+        self.assertEqual(self.cache_state(detail), "HIT")
+
+    def test_one_request_regenerates_while_others_get_the_stale_page(self):
+        self.make_posts(1)
+        url = reverse("blog:posts")
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            pagecache.invalidate(pagecache.POSTS)
+
+        lock = pagecache.LOCK_PREFIX + pagecache.page_key(url)
+        cache.add(lock, 1)
+        self.assertEqual(self.cache_state(url), "STALE")
+        cache.delete(lock)
+        self.assertEqual(self.cache_state(url), "MISS")
+        self.assertIsNone(cache.get(lock))
+        self.assertEqual(self.cache_state(url), "HIT")
+
+    def test_authenticated_users_bypass_the_cache(self):
+        self.make_posts(1)
+        self.client.force_login(User.objects.create_user("reader"))
+        self.assertIsNone(self.cache_state(reverse("blog:home")))
+
+
+class NavigationTests(BlogTestCase):
+    def test_navbar_categories_are_cached_until_they_change(self):
+        (post,) = self.make_posts(1)
+        Category.objects.filter(pk=post.category_id).update(icon="💻")
+        with self.captureOnCommitCallbacks(execute=True):
+            pagecache.invalidate(pagecache.NAV)
+
+        response = self.client.get(reverse("blog:about"))
+        self.assertContains(response, reverse("blog:category_posts", args=[post.category.slug]))
+        self.assertContains(response, "💻 Category 0")
+        with self.assertNumQueries(0):
+            self.client.get(reverse("blog:about"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Travel", icon="✈️")
+            self.make_posts(1, start=1)
+        categories = {c.name: c for c in context_processors.nav_categories()}
+        self.assertEqual(categories["Travel"].icon, "✈️")
+        self.assertEqual(categories["Category 1"].published_posts, 1)
+
+        # Drafts aren't counted, as on the category page.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_posts(1, start=4, published=False)
+            post.published = False
+            post.save()
+        categories = {c.name: c for c in context_processors.nav_categories()}
+        self.assertEqual(categories["Category 1"].published_posts, 1)
+        self.assertEqual(categories["Category 0"].published_posts, 0)
+
+    def test_navbar_categories_expire_without_a_version_bump(self):
+        (post,) = self.make_posts(1)
+        context_processors.nav_categories()
+        Category.objects.filter(pk=post.category_id).update(icon="💻")
+        self.assertEqual(context_processors.nav_categories()[0].icon, "")
+        with override_settings(BLOG_PAGE_CACHE_TIMEOUT=0):
+            self.assertEqual(context_processors.nav_categories()[0].icon, "💻")
+
+
+class ReadReplicaRouterTests(TestCase):
+    def test_reads_go_to_the_replica_outside_transactions(self):
+        router = ReadReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), "default")
+        # Each test runs in a transaction, whose writes the replica can't see.
+        self.assertEqual(router.db_for_read(Post), "default")
+        with mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(router.db_for_read(Post), "replica")
+        self.assertFalse(router.allow_migrate("replica", "blog"))
+
+
+class MetricsTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_requests_are_recorded_per_view(self):
+        (post,) = self.make_posts(1)
+        self.client.get(reverse("blog:home"))
+        self.client.get(reverse("blog:post_detail", args=[post.pk]))
+
+        stats = metrics.registry.views["blog:post_detail"]
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.queries, 3)
+        self.assertGreater(stats.template_time, 0)
+
+        url = reverse("blog:metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        body = self.client.get(url).content.decode()
+        self.assertIn(
+            'bloghub_requests_total{view="blog:home",method="GET",status="200"} 1', body
+        )
+        self.assertIn('bloghub_request_duration_seconds_count{view="blog:home"} 1', body)
+        self.assertIn('bloghub_db_queries_total{view="blog:post_detail"} 3', body)
+
+    @override_settings(BLOG_SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        self.make_posts(1)
+        with self.assertLogs("blog.metrics", "WARNING") as logs:
+            self.client.get(reverse("blog:posts"))
+        self.assertIn("Slow request: GET /posts/ (blog:posts)", logs.output[0])
+        self.assertIn("FROM \"blog_post\"", logs.output[0])
+
+
+class StatsTests(BlogTestCase):
+    def assertStatsReconciled(self):
+        stored = dict(SiteStatistic.objects.values_list("key", "value"))
+        self.assertEqual(stored, stats.compute_stats())
+
+    def test_incremental_updates_match_a_full_recount(self):
+        first, second, third = self.make_posts(3)
+        self.assertStatsReconciled()
+
+        second.published = False
+        second.save()
+        third.category = first.category
+        third.save()
+        Tag.objects.get(name="Tag 0").posts.add(second, third)
+        self.assertStatsReconciled()
+
+        first.author.delete()
+        self.assertStatsReconciled()
+        self.assertEqual(
+            stats.get_site_stats(),
+            {stats.PUBLISHED_POSTS: 1, stats.ACTIVE_AUTHORS: 1, stats.TOTAL_VIEWS: 0},
+        )
+
+        Tag.objects.get(name="Tag 2").delete()
+        second.published = True
+        second.save()
+        self.assertStatsReconciled()
+
+    def test_upgrade_computes_tag_and_length_statistics(self):
+        _, second = self.make_posts(2)
+        # Before the tag and length statistics existed.
+        SiteStatistic.objects.filter(key__regex=r"^(tag|length):").delete()
+        migration = importlib.import_module("blog.migrations.0016_tag_length_statistics")
+        migration.compute_statistics(django_apps, None)
+        self.assertStatsReconciled()
+
+        SiteStatistic.objects.filter(key__regex=r"^(tag|length):").delete()
+        second.published = False
+        second.save()
+        response = self.client.get(reverse("blog:posts"))
+        self.assertEqual(response.context["facets"].values[facets.LENGTH], [])
+        self.assertEqual(response.context["facets"].values[facets.TAG], [])
+
+    def test_home_page_shows_live_totals(self):
+        self.make_posts(4)
+        response = self.client.get(reverse("blog:home"))
+        self.assertEqual(response.context["total_posts"], 4)
+        self.assertEqual(response.context["total_authors"], 4)
+
+
+class PostCountTests(BlogTestCase):
+    def assertCounts(self, model, expected):
+        self.assertEqual(dict(model.objects.values_list("name", "post_count")), expected)
+
+    def test_counts_follow_categories_and_tags(self):
+        first, second = self.make_posts(2)
+        tag = Tag.objects.get(name="Tag 0")
+        tag.posts.add(second)
+        self.assertCounts(Tag, {"Tag 0": 2, "Tag 1": 1})
+
+        second.tags.remove(tag, tag)
+        first.category = second.category
+        first.save()
+        self.assertCounts(Tag, {"Tag 0": 1, "Tag 1": 1})
+        self.assertCounts(Category, {"Category 0": 0, "Category 1": 2})
+
+        second.delete()
+        tag.posts.clear()
+        self.assertCounts(Tag, {"Tag 0": 0, "Tag 1": 0})
+        self.assertCounts(Category, {"Category 0": 0, "Category 1": 1})
+
+    def test_admin_changelists_use_a_fixed_number_of_queries(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(admin)
+        for total in (2, 10):
+            self.make_posts(total - Post.objects.count(), start=Post.objects.count())
+            for model in ("post", "category", "tag"):
+                with self.subTest(posts=total, model=model):
+                    with assert_query_budget(12):
+                        response = self.client.get(f"/admin/blog/{model}/")
+                    self.assertEqual(response.status_code, 200)
+
+
+class ExportTests(BlogTestCase):
+    def test_exports_posts_with_tags_in_each_format(self):
+        first, second = self.make_posts(2)
+        second.tags.add(Tag.objects.create(name="Extra"))
+
+        with self.assertNumQueries(2):
+            rows = [json.loads(line) for line in b"".join(export.export_posts()).splitlines()]
+        self.assertEqual([row["title"] for row in rows], [first.title, second.title])
+        self.assertEqual(rows[1]["tags"], ["Extra", "Tag 1"])
+        self.assertEqual(rows[1]["author"], "writer1")
+
+        data = gzip.decompress(b"".join(export.export_posts("csv", compress=True)))
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        self.assertEqual(rows[1]["tags"], "Extra|Tag 1")
+
+    def test_export_endpoint_is_staff_only_and_streams(self):
+        self.make_posts(1)
+        url = reverse("blog:export_posts")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = User.objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {"format": "csv", "gzip": "1"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    async def test_export_streams_block_by_block_under_asgi(self):
+        await sync_to_async(self.make_posts)(3)
+        staff = await sync_to_async(User.objects.create_user)("staff", is_staff=True)
+        await self.async_client.aforce_login(staff)
+        pulled = []
+
+        def export_posts(*args):
+            for row in export.post_rows():
+                pulled.append(row["id"])
+                yield json.dumps(row).encode() + b"\n"
+
+        with mock.patch.object(export, "export_posts", export_posts):
+            response = await self.async_client.get(reverse("blog:export_posts"))
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            await anext(chunks)
+            # Only the first block has been produced so far.
+            self.assertEqual(len(pulled), 1)
+            self.assertEqual(len([chunk async for chunk in chunks]), 2)
+        self.assertEqual(len(pulled), 3)
+
+
+class ImportTests(BlogTestCase):
+    def test_import_upserts_by_title_and_resumes_from_checkpoint(self):
+        first, second = self.make_posts(2)
+        path = os.path.join(tempfile.mkdtemp(), "posts.csv.gz")
+        self.addCleanup(os.remove, path)
+        with open(path, "wb") as f:
+            f.writelines(export.export_posts("csv", compress=True))
+
+        second.author.delete()
+        autocomplete.index.load()
+        Post.objects.filter(pk=first.pk).update(excerpt="Changed")
+        with open(f"{path}.checkpoint", "w") as f:
+            json.dump({"rows": 1}, f)
+        call_command("import_posts", path, stdout=io.StringIO())
+
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+        self.assertEqual(Post.objects.get(pk=first.pk).excerpt, "Changed")
+        imported = Post.objects.get(title=second.title)
+        self.assertEqual(imported.author.profile.slug, "writer-1")
+        self.assertEqual([tag.name for tag in imported.tags.all()], ["Tag 1"])
+        self.assertEqual(search.search("django").paginator.count, 2)
+        # Loaded before the import, the suggestions are reloaded after it.
+        self.assertIn(second.title, [s["label"] for s in autocomplete.suggest(second.title)])
+
+        call_command("import_posts", path, stdout=io.StringIO())
+        self.assertEqual(Post.objects.get(pk=first.pk).excerpt, "Excerpt 0")
+        self.assertEqual(Tag.objects.get(name="Tag 1").post_count, 1)
+
+
+class GenerateDataTests(BlogTestCase):
+    def generate(self, *args):
+        call_command(
+            "generate_data", "--authors", "5", "--seed", "1", *args, stdout=io.StringIO()
+        )
+
+    def test_generated_text_has_no_paragraph_sentinels(self):
+        self.generate("--posts", "300", "--skip-index")
+        for excerpt, content in Post.objects.values_list("excerpt", "content"):
+            self.assertNotIn("\x00", excerpt)
+            self.assertNotIn("\x00", content)
+
+    def test_generated_posts_are_suggested(self):
+        autocomplete.index.load()
+        self.generate("--posts", "5", "--skip-index")
+        title = Post.objects.latest("id").title
+        self.assertIn(title, [s["label"] for s in autocomplete.suggest(title)])
+
+    def test_clear_bulk_deletes_and_rebuilds_derived_data(self):
+        self.make_posts(3)
+        # Post counts are never recounted when skipping the index.
+        self.generate("--posts", "30", "--skip-index")
+        with CaptureQueriesContext(connection) as queries:
+            self.generate("--clear", "--posts", "0", "--skip-index")
+        self.assertLess(len(queries), 50)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            dict(SiteStatistic.objects.values_list("key", "value")), stats.compute_stats()
+        )
+        self.assertEqual(search.search("django").paginator.count, 0)
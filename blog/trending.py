@@ -0,0 +1,150 @@
+"""
+Trending posts: views decayed by age.
+
+The view counter adds every flushed batch of views to hourly
+``PostViewBucket`` rows (``record_views()``). On a schedule, ``rebuild()``
+(the ``compute_trending`` command) scores each published post as
+
+    sum of bucket views * 0.5 ** (bucket age in hours / half-life)
+
+over the buckets of the last ``BLOG_TRENDING_WINDOW_HOURS``, and replaces the
+``TrendingPost`` snapshot with the top posts site-wide and per category.
+Pages read the snapshot, a few rows by index, instead of ranking posts.
+"""
+
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import pagecache
+from .models import Post, PostViewBucket, TrendingPost
+
+
+def half_life():
+    return getattr(settings, "BLOG_TRENDING_HALF_LIFE_HOURS", 6.0)
+
+
+def window():
+    return getattr(settings, "BLOG_TRENDING_WINDOW_HOURS", 72)
+
+
+def size():
+    return getattr(settings, "BLOG_TRENDING_SIZE", 10)
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def trending_posts(category_id=None):
+    """
+    Card projections of the trending published posts, site-wide or in one
+    category, best first. Each carries the snapshot time as ``trending_at``.
+    """
+    # The rank condition keeps the join inner when ``category_id`` is None.
+    return (
+        Post.objects.filter(
+            published=True, trending__category_id=category_id, trending__rank__gte=1
+        )
+        .cards()
+        .annotate(trending_at=F("trending__computed_at"))
+        .order_by("trending__rank")
+    )
+
+
+def upsert_sql():
+    quote = connection.ops.quote_name
+    # Selecting from the post table skips posts deleted since they were viewed.
+    return (
+        "INSERT INTO {bucket} ({post_id}, {hour}, {views}) "
+        "SELECT {id}, %s, %s FROM {post} WHERE {id} = %s "
+        "ON CONFLICT ({post_id}, {hour}) DO UPDATE SET {views} = {views} + excluded.{views}"
+    ).format(
+        bucket=quote(PostViewBucket._meta.db_table),
+        post=quote(Post._meta.db_table),
+        id=quote("id"),
+        post_id=quote("post_id"),
+        hour=quote("hour"),
+        views=quote("views"),
+    )
+
+
+def record_views(views, now=None):
+    """Add ``{post id: views}`` to the posts' buckets of the current hour."""
+    hour = connection.ops.adapt_datetimefield_value(current_hour(now))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            upsert_sql(), [(hour, count, post_id) for post_id, count in views.items()]
+        )
+
+
+def compute(top=None, half_life_hours=None, window_hours=None, now=None):
+    """
+    ``{category id or None: [(post id, score), ...]}``, best first; ``None``
+    holds the site-wide ranking.
+    """
+    top = top or size()
+    half_life_hours = half_life_hours or half_life()
+    now = now or timezone.now()
+    since = current_hour(now) - timedelta(hours=window_hours or window())
+
+    scores = defaultdict(float)
+    category_of = {}
+    buckets = PostViewBucket.objects.filter(hour__gte=since, post__published=True).values_list(
+        "post_id", "post__category_id", "hour", "views"
+    )
+    for post_id, category_id, hour, views in buckets.iterator():
+        age = max((now - hour).total_seconds() / 3600, 0)
+        scores[post_id] += views * 0.5 ** (age / half_life_hours)
+        category_of[post_id] = category_id
+
+    by_category = defaultdict(list)
+    for post_id, score in scores.items():
+        if category_of[post_id] is not None:
+            by_category[category_of[post_id]].append((post_id, score))
+    by_category[None] = list(scores.items())
+    # Ties go to the newer post.
+    return {
+        category_id: heapq.nlargest(top, ranked, key=lambda item: (item[1], item[0]))
+        for category_id, ranked in by_category.items()
+    }
+
+
+def rebuild(top=None, half_life_hours=None, window_hours=None):
+    """
+    Replace the trending snapshot and drop buckets older than the window;
+    returns the number of ranked places stored.
+    """
+    now = timezone.now()
+    rankings = compute(top, half_life_hours, window_hours, now)
+    since = current_hour(now) - timedelta(hours=window_hours or window())
+    with transaction.atomic():
+        PostViewBucket.objects.filter(hour__lt=since).delete()
+        old_categories = set(
+            TrendingPost.objects.exclude(category=None).values_list("category_id", flat=True)
+        )
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(
+                post_id=post_id,
+                category_id=category_id,
+                rank=rank,
+                score=score,
+                computed_at=now,
+            )
+            for category_id, ranked in rankings.items()
+            for rank, (post_id, score) in enumerate(ranked, start=1)
+        )
+        pagecache.invalidate(
+            pagecache.POSTS,
+            *(
+                pagecache.category_tag(category_id)
+                for category_id in (old_categories | set(rankings)) - {None}
+            ),
+        )
+    return sum(len(ranked) for ranked in rankings.values())
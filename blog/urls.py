@@ -10,9 +10,12 @@ urlpatterns = [
     path("about/", views.about, name="about"),
     path("contact/", views.contact, name="contact"),
     path("posts/", views.posts, name="posts"),
-    path("category/<str:category_name>/", views.category_posts, name="category_posts"),
+    path("category/<slug:category_slug>/", views.category_posts, name="category_posts"),
     path("search/", views.search_posts, name="search_posts"),
-    path("author/<str:author_name>/", views.author_posts, name="author_posts"),
+    path("search/autocomplete/", views.search_autocomplete, name="search_autocomplete"),
+    path("author/<slug:author_slug>/", views.author_posts, name="author_posts"),
+    path("posts/export/", views.export_posts, name="export_posts"),
+    path("metrics/", views.prometheus_metrics, name="metrics"),
     path("posts/", views.PostListView.as_view(), name="post_list"),
     path("posts/create/", views.PostCreateView.as_view(), name="post_create"),
     path("posts/<int:pk>/", views.PostDetailView.as_view(), name="post_detail"),
@@ -1,6 +1,11 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect
 from datetime import datetime
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.generic import (
     ListView,
     DetailView,
@@ -9,17 +14,70 @@ from django.views.generic import (
     DeleteView,
 )
 from django.urls import reverse_lazy
-from .models import Post
+from .counters import view_counter
+from .models import AuthorProfile, Category, Post
+from .pagecache import page_cache
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .querybudget import query_budget
+from . import (
+    autocomplete,
+    conditional,
+    export,
+    facets,
+    metrics,
+    pagecache,
+    related,
+    search,
+    stats,
+    trending,
+)
+
+POSTS_PER_PAGE = 12
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def count_cached_view(request, post_id=None, pk=None):
+    view_counter.record(post_id or pk)
+
+
+def tag_post_page(request, post, tags, related_posts):
+    pagecache.tag(
+        request,
+        pagecache.author_tag(post.author_id),
+        *([pagecache.category_tag(post.category_id)] if post.category_id else []),
+        *(pagecache.tag_tag(tag.pk) for tag in tags),
+        *(pagecache.post_tag(other.pk) for other in related_posts),
+    )
 
 
-def home(request):
-    featured_posts = Post.objects.filter(is_featured=True)
+async def arender(request, template_name, context):
+    # Context processors may still touch the database lazily (``user``), so
+    # templates are rendered off the event loop. Page budgets include one
+    # query for the navbar's categories, run only when they changed since
+    # this process last loaded them.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@query_budget(4)
+@page_cache()
+async def home(request):
+    pagecache.tag(request, pagecache.POSTS)
+    featured_posts, trending_posts, site_stats = await asyncio.gather(
+        alist(
+            Post.objects.filter(is_featured=True).cards()
+        ),
+        alist(trending.trending_posts()),
+        stats.aget_site_stats(),
+    )
 
     context = {
         "site_name": "BlogHub",
         "tagline": "Your Platform for Sharing Ideas",
-        "total_posts": 247,
-        "total_authors": 45,
+        "total_posts": site_stats[stats.PUBLISHED_POSTS],
+        "total_authors": site_stats[stats.ACTIVE_AUTHORS],
         "current_year": datetime.now().year,
         "featured_topics": ["Technology", "Design", "Travel", "Education", "Lifestyle"],
         "features": [
@@ -47,11 +105,13 @@ def home(request):
         "is_featured_active": True,
         "spotlight_topic": "Web Development",
         "featured_posts": featured_posts,
+        "trending_posts": trending_posts,
     }
 
-    return render(request, "blog/home.html", context)
+    return await arender(request, "blog/home.html", context)
 
 
+@query_budget(1)
 def about(request):
     context = {
         "current_year": datetime.now().year,
@@ -70,67 +130,132 @@ def about(request):
     return render(request, "blog/about.html", context)
 
 
-def posts(request):
-    posts = Post.objects.filter(published=True)
+@query_budget(5)
+@page_cache()
+async def posts(request):
+    pagecache.tag(request, pagecache.POSTS)
+    count, latest = await asyncio.gather(
+        stats.apublished_post_count(), conditional.alatest_update()
+    )
+    # Filtered pages are distinct URLs, and what they show changes with the
+    # posts' updated_at like any listing.
+    validators = conditional.listing_validators(latest, count)
+    if response := conditional.not_modified(request, validators):
+        return response
+
+    filters = facets.parse_filters(request.GET)
+    posts = facets.filter_posts(Post.objects.filter(published=True).cards(), filters)
+    if filters:
+        post_facets = await facets.afacets(posts, request.GET)
+        count = post_facets.total
+    else:
+        # Every published post: the statistics already count them per facet.
+        post_facets = facets.Facets(await stats.apublished_facets(), request.GET)
+    page = await KeysetPaginator(posts, POSTS_PER_PAGE, count=count).apage(
+        request.GET.get("cursor")
+    )
     context = {
         "page_title": "All Blog Posts",
         "current_year": datetime.now().year,
-        "posts": posts,
-        "total_posts": len(posts),
+        "posts": page.object_list,
+        "page_obj": page,
+        "total_posts": page.count,
+        "facets": post_facets,
     }
-    return render(request, "blog/posts.html", context)
-
-
-def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    tags = post.tags.all()
-    context = {"post": post, "tags": tags}
-    return render(request, "blog/post_detail.html", context)
-
-
-def category_posts(request, category_name):
-    posts = Post.objects.filter(published=True)
-
-    if category_name != category_name.lower():
-        return redirect("blog:category_posts", category_name=category_name.lower())
-
-    filtered_posts = [
-        post for post in posts if post.category.name.lower() == category_name
-    ]
+    response = await arender(request, "blog/posts.html", context)
+    return conditional.add_validators(request, response, validators)
+
+
+@query_budget(4)
+@page_cache(on_hit=count_cached_view)
+async def post_detail(request, post_id):
+    pagecache.tag(request, pagecache.post_tag(post_id))
+    post = await aget_object_or_404(
+        Post.objects.select_related("author", "category"), id=post_id
+    )
+    # A revalidated page is still a view.
+    await view_counter.arecord(post.pk)
+    validators = conditional.post_validators(post)
+    if response := conditional.not_modified(request, validators):
+        return response
+
+    post.views = view_counter.live_count(post)
+    tags = await alist(post.tags.all())
+    related_posts = await alist(related.related_posts(post.pk))
+    tag_post_page(request, post, tags, related_posts)
+    context = {"post": post, "tags": tags, "related_posts": related_posts}
+    response = await arender(request, "blog/post_detail.html", context)
+    return conditional.add_validators(request, response, validators)
+
+
+@query_budget(6)
+@page_cache()
+async def category_posts(request, category_slug):
+    if category_slug != category_slug.lower():
+        return redirect("blog:category_posts", category_slug=category_slug.lower())
+
+    category = await aget_object_or_404(Category, slug=category_slug)
+    pagecache.tag(request, pagecache.category_tag(category.pk))
+    count, latest, trending_posts = await asyncio.gather(
+        stats.acategory_post_count(category.pk),
+        conditional.alatest_update(),
+        alist(trending.trending_posts(category.pk)),
+    )
+    # A new trending snapshot changes the page too.
+    if trending_posts:
+        latest = max(filter(None, [latest, trending_posts[0].trending_at]))
+    validators = conditional.listing_validators(latest, count)
+    if response := conditional.not_modified(request, validators):
+        return response
+
+    posts = Post.objects.filter(published=True, category=category).cards()
+    page = await KeysetPaginator(posts, POSTS_PER_PAGE, count=count).apage(
+        request.GET.get("cursor")
+    )
 
     context = {
-        "category_name": category_name.title(),
-        "posts": filtered_posts,
-        "total_posts": len(filtered_posts),
+        "category_name": category.name,
+        "trending_posts": trending_posts,
+        "posts": page.object_list,
+        "page_obj": page,
+        "total_posts": page.count,
     }
-    return render(request, "blog/category_posts.html", context)
+    response = await arender(request, "blog/category_posts.html", context)
+    return conditional.add_validators(request, response, validators)
 
 
-def search_posts(request):
-    posts = Post.objects.filter(published=True)
+@query_budget(5)
+async def search_posts(request):
     query = request.GET.get("q", "")
-
-    if not query:
-        search_results = posts
-    else:
-        search_results = [
-            post
-            for post in posts
-            if query.lower() in post.title.lower()
-            or query.lower() in post.excerpt.lower()
-            or query.lower() in post.category.name.lower()
-            or query.lower() in post.author.first_name.lower()
-            or query.lower() in post.author.last_name.lower()
-        ]
+    filters = facets.parse_filters(request.GET)
+    narrowed = facets.filter_posts(Post.objects.filter(published=True), filters)
+    page = await sync_to_async(search.search)(
+        query, request.GET.get("page"), posts=narrowed if filters else None
+    )
+    search_facets = None
+    if page.paginator.count:
+        matches = facets.filter_posts(search.matching_posts(query), filters)
+        search_facets = await facets.afacets(matches, request.GET)
 
     context = {
         "query": query,
-        "posts": search_results,
-        "total_results": len(search_results),
+        "posts": page.object_list,
+        "page_obj": page,
+        "total_results": page.paginator.count,
+        "facets": search_facets,
+        "filters": filters,
     }
-    return render(request, "blog/search_results.html", context)
+    return await arender(request, "blog/search_results.html", context)
+
 
+# Only the requests that (re)load the suggestion index query the database.
+@query_budget(4)
+def search_autocomplete(request):
+    query = request.GET.get("q", "")[: autocomplete.MAX_KEY_LENGTH]
+    return JsonResponse({"query": query, "suggestions": autocomplete.suggest(query)})
 
+
+@query_budget(1)
 def contact(request):
     if request.method == "POST":
         name = request.POST.get("name")
@@ -168,36 +293,119 @@ def contact(request):
     return render(request, "blog/contact.html", context)
 
 
-def author_posts(request, author_name):
-    posts = Post.objects.filter(published=True)
-    author_slug = author_name.lower().replace(" ", "-")
-
-    filtered = [
-        p
-        for p in posts
-        if f"{p.author.first_name.lower()} {p.author.last_name.lower()}" == author_slug
-    ]
+@query_budget(5)
+@page_cache()
+async def author_posts(request, author_slug):
+    if author_slug != author_slug.lower():
+        return redirect("blog:author_posts", author_slug=author_slug.lower())
+
+    profile = await aget_object_or_404(
+        AuthorProfile.objects.select_related("user"), slug=author_slug
+    )
+    pagecache.tag(request, pagecache.author_tag(profile.user_id))
+    count, latest = await asyncio.gather(
+        stats.aauthor_post_count(profile.user_id), conditional.alatest_update()
+    )
+    validators = conditional.listing_validators(latest, count)
+    if response := conditional.not_modified(request, validators):
+        return response
+
+    posts = Post.objects.filter(published=True, author_id=profile.user_id).cards()
+    page = await KeysetPaginator(posts, POSTS_PER_PAGE, count=count).apage(
+        request.GET.get("cursor")
+    )
 
     context = {
-        "author_name": author_name.replace("-", " ").title(),
-        "posts": filtered,
-        "total_posts": len(filtered),
+        "author_name": profile.user.get_full_name() or profile.user.username,
+        "posts": page.object_list,
+        "page_obj": page,
+        "total_posts": page.count,
         "current_year": datetime.now().year,
     }
-    return render(request, "blog/author_posts.html", context)
-
-
-class PostListView(ListView):
+    response = await arender(request, "blog/author_posts.html", context)
+    return conditional.add_validators(request, response, validators)
+
+
+@staff_member_required
+def export_posts(request):
+    format = request.GET.get("format", "jsonl")
+    if format not in export.FORMATS:
+        raise Http404(f"Unknown export format {format!r}.")
+    compress = request.GET.get("gzip") == "1"
+
+    filename = f"posts.{format}" + (".gz" if compress else "")
+    chunks = export.export_posts(format, compress)
+    if isinstance(request, ASGIRequest):
+        chunks = export.aiterate(chunks)
+    response = StreamingHttpResponse(
+        chunks,
+        content_type="application/gzip" if compress else export.CONTENT_TYPES[format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def prometheus_metrics(request):
+    return HttpResponse(
+        metrics.registry.render() + autocomplete.render_metrics(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@page_cache()
+class PostListView(KeysetPaginationMixin, ListView):
     model = Post
-    template_name = "blog/post_list.html"
+    template_name = "blog/posts.html"
     context_object_name = "posts"
-    queryset = Post.objects.filter(published=True)
-
-
+    queryset = Post.objects.filter(published=True).cards()
+    paginate_by = POSTS_PER_PAGE
+    query_budget = 4
+
+    def get(self, request, *args, **kwargs):
+        pagecache.tag(request, pagecache.POSTS)
+        validators = conditional.listing_validators(
+            conditional.latest_update(), stats.published_post_count()
+        )
+        if response := conditional.not_modified(request, validators):
+            return response
+        response = super().get(request, *args, **kwargs)
+        return conditional.add_validators(request, response, validators)
+
+    def get_pagination_count(self):
+        return stats.published_post_count()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["page_title"] = "All Blog Posts"
+        context["current_year"] = datetime.now().year
+        context["total_posts"] = context["page_obj"].count
+        return context
+
+
+@page_cache(on_hit=count_cached_view)
 class PostDetailView(DetailView):
     model = Post
+    queryset = Post.objects.select_related("author", "category")
     template_name = "blog/post_detail.html"
     context_object_name = "post"
+    query_budget = 4
+
+    async def get(self, request, *args, **kwargs):
+        pagecache.tag(request, pagecache.post_tag(kwargs["pk"]))
+        self.object = await aget_object_or_404(self.get_queryset(), pk=kwargs["pk"])
+        await view_counter.arecord(self.object.pk)
+        validators = conditional.post_validators(self.object)
+        if response := conditional.not_modified(request, validators):
+            return response
+
+        self.object.views = view_counter.live_count(self.object)
+        context = self.get_context_data(object=self.object)
+        context["tags"] = await alist(self.object.tags.all())
+        context["related_posts"] = await alist(related.related_posts(self.object.pk))
+        tag_post_page(request, self.object, context["tags"], context["related_posts"])
+        response = self.render_to_response(context)
+        return conditional.add_validators(request, response, validators)
 
 
 class PostCreateView(CreateView):
@@ -212,6 +420,9 @@ class PostCreateView(CreateView):
     ]
     template_name = "blog/post_create.html"
     success_url = reverse_lazy("blog:post_list")
+    # Writes also run the search, stats and post count signal handlers;
+    # budgets cover the worst case, e.g. an author's first or last post.
+    query_budget = 18
 
 
 class PostUpdateView(UpdateView):
@@ -226,9 +437,15 @@ class PostUpdateView(UpdateView):
     ]
     template_name = "blog/post_update.html"
     success_url = reverse_lazy("blog:post_list")
+    # Writes also run the search, stats and post count signal handlers;
+    # budgets cover the worst case, e.g. an author's first or last post.
+    query_budget = 20
 
 
 class PostDeleteView(DeleteView):
     model = Post
     template_name = "blog/post_delete.html"
     success_url = reverse_lazy("blog:post_list")
+    # Writes also run the search, stats and post count signal handlers;
+    # budgets cover the worst case, e.g. an author's first or last post.
+    query_budget = 16
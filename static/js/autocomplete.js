@@ -0,0 +1,60 @@
+// Search suggestions for inputs marked with data-autocomplete="<endpoint>".
+(function () {
+    var DELAY = 120;
+    // The endpoint answers for at most this many characters of the query,
+    // as blog.autocomplete.MAX_KEY_LENGTH.
+    var MAX_QUERY_LENGTH = 64;
+
+    function truncate(text) {
+        // By code point, like the server's slice.
+        return Array.from(text).slice(0, MAX_QUERY_LENGTH).join("");
+    }
+
+    function pickedSuggestion(event) {
+        // Choosing a datalist option fires an input event without an
+        // inputType (Chrome) or with "insertReplacementText" (Firefox);
+        // typing the same text fires "insertText".
+        return event.inputType === undefined || event.inputType === "insertReplacementText";
+    }
+
+    document.querySelectorAll("input[data-autocomplete]").forEach(function (input, i) {
+        var list = document.createElement("datalist");
+        list.id = "search-suggestions-" + i;
+        input.setAttribute("list", list.id);
+        input.setAttribute("autocomplete", "off");
+        input.after(list);
+
+        var timer = null;
+        var urls = {};
+        input.addEventListener("input", function (event) {
+            if (pickedSuggestion(event) && urls[input.value]) {
+                // A suggestion was picked: go straight to it.
+                window.location = urls[input.value];
+                return;
+            }
+            clearTimeout(timer);
+            var query = truncate(input.value.trim());
+            if (!query) {
+                list.replaceChildren();
+                return;
+            }
+            timer = setTimeout(function () {
+                fetch(input.dataset.autocomplete + "?q=" + encodeURIComponent(query))
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        if (data.query !== truncate(input.value.trim())) {
+                            return;
+                        }
+                        urls = {};
+                        list.replaceChildren.apply(list, data.suggestions.map(function (s) {
+                            urls[s.label] = s.url;
+                            var option = document.createElement("option");
+                            option.value = s.label;
+                            option.label = s.kind;
+                            return option;
+                        }));
+                    });
+            }, DELAY);
+        });
+    });
+})();